@@ -1,24 +1,33 @@
+import logging
 from fastapi import APIRouter, HTTPException, status, Depends
 from models.schemas_auth import UserCreate, UserLogin, Token, UserResponse
 from services.user_service import create_user, authenticate_user, get_user_by_id
-from auth_utils import create_access_token, verify_token, require_authenticated
+from auth_utils import create_access_token, verify_token, require_authenticated, PasswordHashingBusyError
 from datetime import timedelta
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 @router.post("/register", response_model=UserResponse)
 async def register(user_data: UserCreate):
     """Register a new user."""
     try:
-        user = create_user(user_data)
+        user = await create_user(user_data)
         return user
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    except PasswordHashingBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins in progress, please retry",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
-        print(f"❌ Registration error: {e}")
+        logger.exception("Registration error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Registration failed"
@@ -28,7 +37,7 @@ async def register(user_data: UserCreate):
 async def login(login_data: UserLogin):
     """Login user and return JWT token."""
     try:
-        user = authenticate_user(login_data.email, login_data.password)
+        user = await authenticate_user(login_data.email, login_data.password)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
@@ -55,8 +64,14 @@ async def login(login_data: UserLogin):
         
     except HTTPException:
         raise
+    except PasswordHashingBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-ins in progress, please retry",
+            headers={"Retry-After": "1"}
+        )
     except Exception as e:
-        print(f"❌ Login error: {e}")
+        logger.exception("Login error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Login failed"
@@ -66,7 +81,7 @@ async def login(login_data: UserLogin):
 async def get_current_user(user_data: dict = Depends(require_authenticated)):
     """Get current user information."""
     try:
-        user = get_user_by_id(user_data["user_id"])
+        user = await get_user_by_id(user_data["user_id"])
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -74,7 +89,7 @@ async def get_current_user(user_data: dict = Depends(require_authenticated)):
             )
         return user
     except Exception as e:
-        print(f"❌ Get current user error: {e}")
+        logger.exception("Get current user error")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get user information"
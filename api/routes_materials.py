@@ -1,8 +1,9 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
-from fastapi.responses import Response
-from services.material_manger import upload_material, download_material, get_materials_by_section, get_material_info
-from auth_utils import require_authenticated
-import urllib.parse
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Header, Query
+from services.material_manger import upload_material, open_material_file, delete_material, MaterialTooLargeError, MaterialStorageBusyError, get_materials_by_section, get_material_info
+from utils.file_streaming import build_download_response
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
+from auth_utils import require_authenticated, require_teacher
 
 router = APIRouter(prefix="/materials", tags=["Materials"])
 
@@ -18,16 +19,11 @@ async def upload_material_route(
     AUTHENTICATED ACCESS REQUIRED
     """
     try:
-        file_content = await file.read()
-        
-        # Check file size (limit to 16MB - MongoDB document limit)
-        if len(file_content) > 16 * 1024 * 1024:
-            raise HTTPException(status_code=400, detail="File too large. Maximum size is 16MB.")
-            
         teacher_id = user_data["user_id"]
 
-        material_id = upload_material(
-            file_data=file_content,
+        # Copied into GridFS straight from the upload stream, size checked as it goes
+        material_id = await upload_material(
+            file_data=file,
             filename=file.filename,
             teacher_id=teacher_id,
             section=section,
@@ -41,51 +37,59 @@ async def upload_material_route(
             "uploaded_by": user_data["email"]
         }
 
+    except MaterialTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MaterialStorageBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
 @router.get("/download/{material_id}")
-async def download_material_route(material_id: str, user_data: dict = Depends(require_authenticated)):
+async def download_material_route(
+    material_id: str,
+    range_header: str = Header(None, alias="Range"),
+    user_data: dict = Depends(require_authenticated)
+):
     """
-    Download a material file from MongoDB cloud storage.
+    Stream a material file from MongoDB cloud storage.
+    Supports single byte ranges (206 Partial Content) for PDF viewers.
     AUTHENTICATED ACCESS REQUIRED
     """
     try:
-        file_data, filename = download_material(material_id)
-        
-        encoded_filename = urllib.parse.quote(filename)
-        
-        return Response(
-            content=file_data,
-            media_type="application/octet-stream",
-            headers={
-                "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}",
-                "Content-Type": "application/octet-stream"
-            }
-        )
-        
+        grid_out, filename = await open_material_file(material_id)
+        return build_download_response(grid_out, filename, range_header)
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
 
 @router.get("/list/{section}")
-async def list_materials(section: str, user_data: dict = Depends(require_authenticated)):
+async def list_materials(
+    section: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_data: dict = Depends(require_authenticated)
+):
     """
-    List all materials available for a specific section.
+    List the materials available for a specific section, newest first.
+    Pass the returned next_after as ?after= to get the next page.
     AUTHENTICATED ACCESS REQUIRED
     """
     try:
-        materials = get_materials_by_section(section)
-        
-        # Convert ObjectId to string for JSON serialization
-        for material in materials:
-            material["_id"] = str(material["_id"])
-            
+        page = await get_materials_by_section(section, limit, after)
+
         return {
             "section": section,
             "requested_by": user_data["email"],
-            "materials": materials
+            "materials": page["items"],
+            "next_after": page["next_after"]
         }
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list materials: {str(e)}")
 
@@ -96,11 +100,33 @@ async def get_material_info_route(material_id: str, user_data: dict = Depends(re
     AUTHENTICATED ACCESS REQUIRED
     """
     try:
-        material_info = get_material_info(material_id)
+        material_info = await get_material_info(material_id)
         if not material_info:
             raise HTTPException(status_code=404, detail="Material not found")
             
         return material_info
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.delete("/{material_id}")
+async def delete_material_route(material_id: str, user_data: dict = Depends(require_teacher)):
+    """
+    Delete one of your materials. The stored file is only removed once no
+    other material shares the same content.
+    TEACHER ACCESS REQUIRED
+    """
+    try:
+        deleted = await delete_material(material_id, user_data["user_id"])
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Material not found")
+
+        return {
+            "message": "Material deleted successfully",
+            "material_id": material_id
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Delete failed: {str(e)}")
\ No newline at end of file
@@ -1,14 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends,status
+import logging
+from fastapi import APIRouter, HTTPException, Depends, Query, UploadFile, File, status
 from config import grades_collection, attendance_collection
 from auth_utils import require_authenticated, require_teacher, require_student
-from typing import List, Dict
+from utils.pagination import paginate, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from services.monitoring_tools import get_low_grade_subjects, get_attendance_stats, get_section_attendance_stats
+from services.student_rollups import apply_grade, apply_attendance, get_student_rollups, format_rollup
+from services.bulk_import import import_grades, import_attendance, detect_format, BulkImportError
+from services.grade_analytics import get_grade_distribution
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Fields returned by the list endpoints
+GRADE_PROJECTION = {"student_id": 1, "subject": 1, "score": 1, "grade": 1, "quiz_id": 1, "feedback": 1, "timestamp": 1}
+ATTENDANCE_PROJECTION = {"student_id": 1, "date": 1, "status": 1, "subject": 1, "section": 1, "marked_at": 1}
+
 @router.get("/grades/{student_id}")
-def get_student_grades(student_id: str, user_data: dict = Depends(require_authenticated)) -> List[Dict]:
+async def get_student_grades(
+    student_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_data: dict = Depends(require_authenticated)
+) -> Dict:
     """
-    Fetch all grades for a student.
+    Fetch a student's grades, newest first, one page at a time.
+    Pass the returned next_after as ?after= to get the next page.
     AUTHENTICATED ACCESS REQUIRED
     - Students can only see their own grades
     - Teachers can see any student's grades
@@ -21,27 +39,28 @@ def get_student_grades(student_id: str, user_data: dict = Depends(require_authen
                 detail="Students can only view their own grades"
             )
         
-        print(f"📊 {user_data['role']} {user_data['email']} fetching grades for student: {student_id}")
-        grades = grades_collection.find({"student_id": student_id})
-        grades_list = list(grades)
-        
-        # Convert ObjectId to string for JSON serialization
-        for grade in grades_list:
-            grade["_id"] = str(grade["_id"])
-            
-        print(f"✅ Found {len(grades_list)} grades for student {student_id}")
-        return grades_list
+        logger.info("Fetching grades", extra={"user_id": user_data["user_id"], "student_id": student_id})
+        page = await paginate(grades_collection, {"student_id": student_id}, GRADE_PROJECTION, limit, after)
+
+        logger.debug("Grades page fetched", extra={"student_id": student_id, "count": len(page["items"])})
+        return {"grades": page["items"], "next_after": page["next_after"]}
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error fetching grades: {str(e)}")
+        logger.exception("Error fetching grades")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/attendance/{student_id}")
-def get_student_attendance(student_id: str, user_data: dict = Depends(require_authenticated)) -> Dict:
+async def get_student_attendance(
+    student_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_data: dict = Depends(require_authenticated)
+) -> Dict:
     """
-    Fetch attendance data for a student.
+    Fetch a student's attendance, newest first, one page at a time.
+    Pass the returned next_after as ?after= to get the next page.
     AUTHENTICATED ACCESS REQUIRED
     - Students can only see their own attendance
     - Teachers can see any student's attendance
@@ -54,25 +73,20 @@ def get_student_attendance(student_id: str, user_data: dict = Depends(require_au
                 detail="Students can only view their own attendance"
             )
             
-        print(f"📅 {user_data['role']} {user_data['email']} fetching attendance for student: {student_id}")
-        attendance = attendance_collection.find({"student_id": student_id})
-        attendance_list = list(attendance)
-        
-        # Convert ObjectId to string for JSON serialization
-        for record in attendance_list:
-            record["_id"] = str(record["_id"])
-            
-        print(f"✅ Found {len(attendance_list)} attendance records for student {student_id}")
-        return {"attendance": attendance_list}
+        logger.info("Fetching attendance", extra={"user_id": user_data["user_id"], "student_id": student_id})
+        page = await paginate(attendance_collection, {"student_id": student_id}, ATTENDANCE_PROJECTION, limit, after)
+
+        logger.debug("Attendance page fetched", extra={"student_id": student_id, "count": len(page["items"])})
+        return {"attendance": page["items"], "next_after": page["next_after"]}
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error fetching attendance: {str(e)}")
+        logger.exception("Error fetching attendance")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/recommendations/{student_id}")
-def get_recommendations(student_id: str, user_data: dict = Depends(require_authenticated)) -> Dict:
+async def get_recommendations(student_id: str, user_data: dict = Depends(require_authenticated)) -> Dict:
     """
     Generate study recommendations based on grades.
     AUTHENTICATED ACCESS REQUIRED
@@ -87,13 +101,8 @@ def get_recommendations(student_id: str, user_data: dict = Depends(require_authe
                 detail="Students can only view their own recommendations"
             )
             
-        print(f"💡 {user_data['role']} {user_data['email']} generating recommendations for student: {student_id}")
-        grades = list(grades_collection.find({"student_id": student_id}))
-        weak_subjects = []
-        
-        for grade in grades:
-            if grade.get("score", 100) < 60:
-                weak_subjects.append(grade["subject"])
+        logger.info("Generating recommendations", extra={"user_id": user_data["user_id"], "student_id": student_id})
+        weak_subjects = await get_low_grade_subjects(student_id)
         
         recommendations = {
             "student_id": student_id,
@@ -103,17 +112,168 @@ def get_recommendations(student_id: str, user_data: dict = Depends(require_authe
             "generated_by": user_data["email"]
         }
         
-        print(f"✅ Generated recommendations for student {student_id}")
+        logger.debug("Recommendations generated", extra={"student_id": student_id})
         return recommendations
         
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error generating recommendations: {str(e)}")
+        logger.exception("Error generating recommendations")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/attendance-stats/{student_id}")
+async def get_student_attendance_stats(
+    student_id: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    user_data: dict = Depends(require_authenticated)
+) -> Dict:
+    """
+    Attendance totals and rate for one student, optionally within a date range.
+    AUTHENTICATED ACCESS REQUIRED
+    - Students can only see their own stats
+    - Teachers can see any student's stats
+    """
+    try:
+        if user_data["role"] == "student" and user_data["user_id"] != student_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Students can only view their own attendance"
+            )
+
+        stats = await get_attendance_stats(student_id, start_date, end_date)
+        return {"student_id": student_id, **stats}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error computing attendance stats")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/sections/{section}/attendance-stats")
+async def get_section_stats(
+    section: str,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+    user_data: dict = Depends(require_teacher)
+) -> Dict:
+    """
+    Attendance stats for every student of a section, computed in one aggregation.
+    TEACHER ACCESS REQUIRED
+    """
+    try:
+        logger.info("Fetching section attendance stats", extra={"user_id": user_data["user_id"], "section": section})
+        students = await get_section_attendance_stats(section, start_date, end_date)
+        return {"section": section, "students": students, "count": len(students)}
+
+    except Exception as e:
+        logger.exception("Error computing section attendance stats")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/rollups/{student_id}")
+async def get_rollups(
+    student_id: str,
+    subject: Optional[str] = None,
+    user_data: dict = Depends(require_authenticated)
+) -> Dict:
+    """
+    Running grade and attendance totals per subject for a student.
+    AUTHENTICATED ACCESS REQUIRED
+    - Students can only see their own rollups
+    - Teachers can see any student's rollups
+    """
+    try:
+        if user_data["role"] == "student" and user_data["user_id"] != student_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Students can only view their own performance"
+            )
+
+        rollups = await get_student_rollups(student_id, subject)
+        return {"student_id": student_id, "subjects": [format_rollup(rollup) for rollup in rollups]}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.exception("Error fetching rollups")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/analytics/grades")
+async def get_grade_analytics(
+    section: Optional[str] = None,
+    subject: Optional[str] = None,
+    bucket_width: int = Query(10, ge=1, le=50),
+    user_data: dict = Depends(require_teacher)
+) -> Dict:
+    """
+    Grade distribution for a section and/or subject: mean, median, standard
+    deviation, percentiles, histogram, per-student z-scores and at-risk students.
+    TEACHER ACCESS REQUIRED
+    """
+    if not section and not subject:
+        raise HTTPException(status_code=400, detail="Provide a section, a subject or both")
+
+    try:
+        logger.info("Computing grade analytics", extra={"user_id": user_data["user_id"], "section": section, "subject": subject})
+        return await get_grade_distribution(section, subject, bucket_width)
+
+    except Exception as e:
+        logger.exception("Error computing grade analytics")
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Declared before /grades/{student_id} so "bulk" is not taken as a student id
+@router.post("/grades/bulk")
+async def bulk_import_grades(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or ndjson (default: from the file name)"),
+    user_data: dict = Depends(require_teacher)
+) -> Dict:
+    """
+    Import many grades from a CSV (with a header row) or NDJSON file.
+    Each row has the GradeEntry fields: student_id, quiz_id, score and
+    optionally subject, section, feedback, submitted_at.
+    Rows are upserted on (student_id, quiz_id); invalid rows are reported by line.
+    TEACHER ACCESS REQUIRED
+    """
+    try:
+        file_format = detect_format(file.filename, file.content_type, format)
+        report = await import_grades(file, user_data["user_id"], file_format)
+        logger.info("Imported grades", extra={"user_id": user_data["user_id"], "rows": report["rows"], "failed": report["failed"]})
+        return report
+
+    except BulkImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Error importing grades")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/attendance/bulk")
+async def bulk_import_attendance(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, description="csv or ndjson (default: from the file name)"),
+    user_data: dict = Depends(require_teacher)
+) -> Dict:
+    """
+    Import a roll call from a CSV (with a header row) or NDJSON file.
+    Each row has the AttendanceEntry fields: student_id, date, status and
+    optionally subject, section.
+    Rows are upserted on (student_id, date); invalid rows are reported by line.
+    TEACHER ACCESS REQUIRED
+    """
+    try:
+        file_format = detect_format(file.filename, file.content_type, format)
+        report = await import_attendance(file, user_data["user_id"], file_format)
+        logger.info("Imported attendance", extra={"user_id": user_data["user_id"], "rows": report["rows"], "failed": report["failed"]})
+        return report
+
+    except BulkImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.exception("Error importing attendance")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/grades/{student_id}")
-def add_student_grade(
+async def add_student_grade(
     student_id: str, 
     subject: str, 
     score: float, 
@@ -136,8 +296,9 @@ def add_student_grade(
             "timestamp": datetime.utcnow()
         }
         
-        result = grades_collection.insert_one(grade_data)
-        print(f"✅ Teacher {user_data['email']} added grade for student {student_id}: {subject} - {score}%")
+        result = await grades_collection.insert_one(grade_data)
+        await apply_grade(student_id, subject, score)
+        logger.info("Grade added", extra={"user_id": user_data["user_id"], "student_id": student_id, "subject": subject, "score": score})
         
         return {
             "message": "Grade added successfully",
@@ -146,11 +307,11 @@ def add_student_grade(
         }
         
     except Exception as e:
-        print(f"❌ Error adding grade: {str(e)}")
+        logger.exception("Error adding grade")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/attendance/{student_id}")
-def mark_attendance(
+async def mark_attendance(
     student_id: str, 
     date: str, 
     status: str = "present", 
@@ -173,8 +334,9 @@ def mark_attendance(
             "marked_at": datetime.utcnow()
         }
         
-        result = attendance_collection.insert_one(attendance_data)
-        print(f"✅ Teacher {user_data['email']} marked attendance for student {student_id}: {date} - {status}")
+        result = await attendance_collection.insert_one(attendance_data)
+        await apply_attendance(student_id, subject, status)
+        logger.info("Attendance marked", extra={"user_id": user_data["user_id"], "student_id": student_id, "date": date, "status": status})
         
         return {
             "message": "Attendance marked successfully",
@@ -183,51 +345,53 @@ def mark_attendance(
         }
         
     except Exception as e:
-        print(f"❌ Error marking attendance: {str(e)}")
+        logger.exception("Error marking attendance")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/my-grades")
-def get_my_grades(user_data: dict = Depends(require_student)) -> List[Dict]:
+async def get_my_grades(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_data: dict = Depends(require_student)
+) -> Dict:
     """
-    Students can get their own grades.
+    Students can get their own grades, one page at a time.
+    Pass the returned next_after as ?after= to get the next page.
     STUDENT ACCESS REQUIRED
     """
     try:
         student_id = user_data["user_id"]
-        print(f"📊 Student {user_data['email']} fetching their own grades")
-        
-        grades = grades_collection.find({"student_id": student_id})
-        grades_list = list(grades)
-        
-        # Convert ObjectId to string for JSON serialization
-        for grade in grades_list:
-            grade["_id"] = str(grade["_id"])
-            
-        return grades_list
-        
+        logger.info("Fetching own grades", extra={"user_id": student_id})
+
+        page = await paginate(grades_collection, {"student_id": student_id}, GRADE_PROJECTION, limit, after)
+
+        return {"grades": page["items"], "next_after": page["next_after"]}
+
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error fetching grades: {str(e)}")
+        logger.exception("Error fetching grades")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/my-attendance")
-def get_my_attendance(user_data: dict = Depends(require_student)) -> Dict:
+async def get_my_attendance(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_data: dict = Depends(require_student)
+) -> Dict:
     """
-    Students can get their own attendance.
+    Students can get their own attendance, one page at a time.
     STUDENT ACCESS REQUIRED
     """
     try:
         student_id = user_data["user_id"]
-        print(f"📅 Student {user_data['email']} fetching their own attendance")
-        
-        attendance = attendance_collection.find({"student_id": student_id})
-        attendance_list = list(attendance)
-        
-        # Convert ObjectId to string for JSON serialization
-        for record in attendance_list:
-            record["_id"] = str(record["_id"])
-            
-        return {"attendance": attendance_list}
-        
+        logger.info("Fetching own attendance", extra={"user_id": student_id})
+
+        page = await paginate(attendance_collection, {"student_id": student_id}, ATTENDANCE_PROJECTION, limit, after)
+        return {"attendance": page["items"], "next_after": page["next_after"]}
+
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"❌ Error fetching attendance: {str(e)}")
+        logger.exception("Error fetching attendance")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,7 +1,14 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends
+import logging
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
 from models.schemas_student import SummaryResponse
-from services.lecture_summerizer import summarize_lecture_and_store
+from services.lecture_summerizer import summarize_lecture_and_store, stream_lecture_summary, get_summaries_by_student, get_summary_by_id
 from auth_utils import require_student
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
+import json
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="", tags=["Student"])
 
@@ -18,7 +25,7 @@ async def summarize_lecture(
     STUDENT ACCESS REQUIRED
     """
     try:
-        print(f"👨‍🎓 Student {user_data['email']} requesting summary...")
+        logger.info("Summary requested", extra={"user_id": user_data["user_id"]})
         
         file_data = None
         content = None
@@ -26,16 +33,16 @@ async def summarize_lecture(
         if file:
             # Read file as bytes (don't decode - PDF is binary)
             file_data = await file.read()
-            print(f"📄 File uploaded: {file.filename}, Size: {len(file_data)} bytes")
+            logger.debug("File uploaded", extra={"upload_filename": file.filename, "size": len(file_data)})
         
         if lecture_text:
             # Text is already string, no decoding needed
             content = lecture_text
-            print(f"📝 Text length: {len(lecture_text)} characters")
+            logger.debug("Lecture text received", extra={"characters": len(lecture_text)})
 
         student_id = user_data["user_id"]  # Use actual student ID from auth
 
-        summary = summarize_lecture_and_store(
+        summary = await summarize_lecture_and_store(
             student_id=student_id,
             subject=subject,
             lecture_number=lecture_number,
@@ -52,28 +59,88 @@ async def summarize_lecture(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/summarize/stream")
+async def summarize_lecture_stream(
+    subject: str = Form(...),
+    lecture_number: int = Form(...),
+    lecture_text: str = Form(None),
+    file: UploadFile = File(None),
+    user_data: dict = Depends(require_student)
+):
+    """
+    Same as /summarize, but streams the summary back as Server-Sent Events
+    (start, chunk..., done | error) while Gemini generates it.
+    STUDENT ACCESS REQUIRED
+    """
+    logger.info("Streamed summary requested", extra={"user_id": user_data["user_id"]})
+
+    # Read the upload now, it is closed once the handler returns
+    file_data = await file.read() if file else None
+    if not file_data and not lecture_text:
+        raise HTTPException(status_code=400, detail="No lecture text or file provided for summarization")
+
+    async def event_stream():
+        async for event in stream_lecture_summary(
+            student_id=user_data["user_id"],
+            subject=subject,
+            lecture_number=lecture_number,
+            lecture_text=lecture_text,
+            file_data=file_data
+        ):
+            name = event.pop("event")
+            yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @router.get("/my-summaries")
-async def get_student_summaries(user_data: dict = Depends(require_student)):
+async def get_student_summaries(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_data: dict = Depends(require_student)
+):
     """
-    Get all summaries created by the current student.
+    List the summaries created by the current student, newest first.
+    Entries carry no summary body; fetch it with /summaries/{summary_id}.
+    Pass the returned next_after as ?after= to get the next page.
     STUDENT ACCESS REQUIRED
     """
     try:
-        from config import summaries_collection
-        
         student_id = user_data["user_id"]
-        summaries = summaries_collection.find({"student_id": student_id})
-        
-        # Convert ObjectId to string for JSON serialization
-        summaries_list = []
-        for summary in summaries:
-            summary["_id"] = str(summary["_id"])
-            summaries_list.append(summary)
-            
+        page = await get_summaries_by_student(student_id, limit, after)
+
         return {
             "student_id": student_id,
-            "summaries": summaries_list
+            "summaries": page["items"],
+            "next_after": page["next_after"]
         }
-        
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/summaries/{summary_id}")
+async def get_student_summary(summary_id: str, user_data: dict = Depends(require_student)):
+    """
+    Get one of the current student's summaries, including its body.
+    STUDENT ACCESS REQUIRED
+    """
+    try:
+        summary = await get_summary_by_id(summary_id)
+        if not summary or summary.get("student_id") != user_data["user_id"]:
+            raise HTTPException(status_code=404, detail="Summary not found")
+
+        summary["_id"] = str(summary["_id"])
+        return summary
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,21 +1,28 @@
-from fastapi import APIRouter, HTTPException
-from services.material_manger import get_materials_by_section, get_material_info, download_material
-from fastapi.responses import Response
-import urllib.parse
+from fastapi import APIRouter, HTTPException, Header, Query
+from services.material_manger import get_materials_by_section, get_material_info, open_material_file
+from utils.file_streaming import build_download_response
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
 
 router = APIRouter(prefix="/student", tags=["Student Materials"])
 
+STUDENT_MATERIAL_PROJECTION = {"material_id": 1, "filename": 1, "subject": 1, "uploaded_at": 1, "file_size": 1}
+
 @router.get("/materials/{section}")
-async def get_section_materials(section: str):
+async def get_section_materials(
+    section: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None
+):
     """
-    Students can see all materials for their section.
+    Students can see the materials for their section, one page at a time.
     """
     try:
-        materials = get_materials_by_section(section)
+        page = await get_materials_by_section(section, limit, after, STUDENT_MATERIAL_PROJECTION)
         
         # Clean up response for students
         clean_materials = []
-        for material in materials:
+        for material in page["items"]:
             clean_materials.append({
                 "material_id": material["material_id"],
                 "filename": material["filename"],
@@ -26,30 +33,26 @@ async def get_section_materials(section: str):
             
         return {
             "section": section,
-            "materials": clean_materials
+            "materials": clean_materials,
+            "next_after": page["next_after"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get materials: {str(e)}")
 
 @router.get("/materials/download/{material_id}")
-async def student_download_material(material_id: str):
+async def student_download_material(material_id: str, range_header: str = Header(None, alias="Range")):
     """
     Students can download materials.
+    Files are streamed from GridFS and single byte ranges are supported.
     """
     try:
-        file_data, filename = download_material(material_id)
-        
-        encoded_filename = urllib.parse.quote(filename)
-        
-        return Response(
-            content=file_data,
-            media_type="application/octet-stream",
-            headers={
-                "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}",
-                "Content-Type": "application/octet-stream"
-            }
-        )
-        
+        grid_out, filename = await open_material_file(material_id)
+        return build_download_response(grid_out, filename, range_header)
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Download failed: {str(e)}")
\ No newline at end of file
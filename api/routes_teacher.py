@@ -1,12 +1,24 @@
-from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException
-from models.schemas_teacher import QuizRequest, QuizResponse, UploadMaterialResponse
-from services.quizz_generator import generate_quiz_from_material_id, save_quiz_to_mongodb
-from services.material_manger import upload_material
+import json
+import logging
+from fastapi import APIRouter, UploadFile, File, Form, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from models.schemas_teacher import QuizRequest, QuizResponse, QuizJobSubmitted, UploadMaterialResponse
+from services.quiz_jobs import (
+    submit_quiz_job, get_quiz_job, wait_for_quiz_job, iter_quiz_job_events, get_quiz_jobs_by_teacher,
+    QuizQueueFullError, QUIZ_JOB_TIMEOUT_SECONDS, SUCCEEDED, FINISHED_STATUSES
+)
+from services.material_manger import upload_material, MaterialTooLargeError, MaterialStorageBusyError
 from auth_utils import require_teacher
-from utils.llm_client import generate_quiz_with_llm
+from utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from typing import Optional
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="", tags=["Teacher"])
 
+# Longest long-poll a client may ask for with ?wait=
+MAX_JOB_WAIT_SECONDS = 60
+
 @router.post("/upload-material", response_model=UploadMaterialResponse)
 async def upload_material_route(
     class_name: str = Form(...),
@@ -19,16 +31,16 @@ async def upload_material_route(
     TEACHER ACCESS REQUIRED
     """
     try:
-        file_content = await file.read()
         filename = file.filename
         teacher_id = user_data["user_id"]  # Use actual teacher ID from auth
         teacher_email = user_data["email"]
         
 
-        print(f"👨‍🏫 Teacher {teacher_id} uploading material: {filename}")
+        logger.info("Uploading material", extra={"user_id": teacher_id, "upload_filename": filename})
 
-        material_id = upload_material(
-            file_data=file_content,
+        # Copied into GridFS straight from the upload stream, size checked as it goes
+        material_id = await upload_material(
+            file_data=file,
             filename=filename,
             teacher_id=teacher_id,
             section=section
@@ -40,6 +52,10 @@ async def upload_material_route(
             doc_id=material_id
         )
 
+    except MaterialTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MaterialStorageBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -50,61 +66,153 @@ async def generate_quiz(
 ):
     """
     Generate a quiz based on previously uploaded materials for a specific class and section.
+    Waits for the result; prefer POST /quiz-jobs, which returns immediately.
     TEACHER ACCESS REQUIRED
     """
     try:
-        print(f"👨‍🏫 Teacher {user_data['email']} generating quiz...")
-        
-        # If material_ids are provided, use the first one
-        if data.material_ids and len(data.material_ids) > 0:
-            material_id = data.material_ids[0]
-            print(f"📚 Using material ID: {material_id}")
-            quiz = generate_quiz_from_material_id(
-                material_id=material_id,
-                subject=data.subject,
-                level=data.level,
-                num_questions=data.num_questions
-            )
-        else:
-            # Fallback: generate quiz without specific material
-            print("🔧 Using general knowledge fallback")
-            quiz = generate_quiz_with_llm(
-                subject=data.subject,
-                level=data.level,
-                material_text=f"General knowledge about {data.subject} for {data.level} level",
-                num_questions=data.num_questions
-            )
-
-        # Save quiz to MongoDB
-        teacher_id = user_data["user_id"]
-        quiz_id = save_quiz_to_mongodb(
-            teacher_id=teacher_id,
-            section="default",
+        logger.info("Generating quiz", extra={"user_id": user_data["user_id"]})
+
+        # Runs on the same bounded worker pool as submitted jobs
+        job = await submit_quiz_job(
+            teacher_id=user_data["user_id"],
             subject=data.subject,
-            quiz_content=quiz
+            level=data.level,
+            num_questions=data.num_questions,
+            material_ids=data.material_ids
         )
+        job = await wait_for_quiz_job(job["job_id"], QUIZ_JOB_TIMEOUT_SECONDS)
+        if job is None or job["status"] != SUCCEEDED:
+            raise Exception(job["error"] if job and job["error"] else "Quiz generation did not finish")
+
+        return QuizResponse(quiz=job["quiz"])
+
+    except QuizQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/quiz-jobs", response_model=QuizJobSubmitted, status_code=202)
+async def submit_quiz_job_route(
+    data: QuizRequest,
+    request: Request,
+    user_data: dict = Depends(require_teacher)
+):
+    """
+    Queue a quiz generation and return its job ID at once.
+    Follow it with GET /quiz-jobs/{job_id} (?wait= to long-poll)
+    or GET /quiz-jobs/{job_id}/events (Server-Sent Events).
+    TEACHER ACCESS REQUIRED
+    """
+    try:
+        job = await submit_quiz_job(
+            teacher_id=user_data["user_id"],
+            subject=data.subject,
+            level=data.level,
+            num_questions=data.num_questions,
+            material_ids=data.material_ids
+        )
+        return QuizJobSubmitted(
+            job_id=job["job_id"],
+            status=job["status"],
+            status_url=str(request.url_for("get_quiz_job_route", job_id=job["job_id"])),
+            events_url=str(request.url_for("quiz_job_events_route", job_id=job["job_id"]))
+        )
+
+    except QuizQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        return QuizResponse(quiz=quiz)
+@router.get("/quiz-jobs")
+async def list_quiz_jobs(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_data: dict = Depends(require_teacher)
+):
+    """
+    The current teacher's quiz jobs, newest first, without the quiz text.
+    Pass the returned next_after as ?after= to get the next page.
+    TEACHER ACCESS REQUIRED
+    """
+    try:
+        page = await get_quiz_jobs_by_teacher(user_data["user_id"], limit, after)
+        return {"jobs": page["items"], "next_after": page["next_after"]}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _get_own_job(job_id: str, teacher_id: str) -> dict:
+    job = await get_quiz_job(job_id)
+    if not job or job["teacher_id"] != teacher_id:
+        raise HTTPException(status_code=404, detail="Quiz job not found")
+    return job
+
+@router.get("/quiz-jobs/{job_id}")
+async def get_quiz_job_route(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=MAX_JOB_WAIT_SECONDS, description="Seconds to wait for the job to finish"),
+    user_data: dict = Depends(require_teacher)
+):
+    """
+    Status of a quiz job (queued, running, succeeded or failed), with the
+    quiz once it succeeded. With ?wait= the response is held until the job
+    finishes or the wait runs out.
+    TEACHER ACCESS REQUIRED
+    """
+    job = await _get_own_job(job_id, user_data["user_id"])
+    if wait > 0 and job["status"] not in FINISHED_STATUSES:
+        job = await wait_for_quiz_job(job_id, wait)
+    return job
+
+@router.get("/quiz-jobs/{job_id}/events")
+async def quiz_job_events_route(job_id: str, user_data: dict = Depends(require_teacher)):
+    """
+    Server-Sent Events for a quiz job: one event per status change
+    (queued, running, succeeded | failed) and a ping while nothing changes.
+    The stream ends once the job has finished.
+    TEACHER ACCESS REQUIRED
+    """
+    await _get_own_job(job_id, user_data["user_id"])
+
+    async def event_stream():
+        async for job in iter_quiz_job_events(job_id):
+            yield f"event: {job['status']}\ndata: {json.dumps(job, default=str)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
+
 @router.get("/my-materials")
-async def get_teacher_materials(user_data: dict = Depends(require_teacher)):
+async def get_teacher_materials(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[str] = None,
+    user_data: dict = Depends(require_teacher)
+):
     """
-    Get all materials uploaded by the current teacher.
+    Get the materials uploaded by the current teacher, newest first.
+    Pass the returned next_after as ?after= to get the next page.
     TEACHER ACCESS REQUIRED
     """
     try:
         from services.material_manger import get_materials_by_teacher
         
         teacher_id = user_data["user_id"]
-        materials = get_materials_by_teacher(teacher_id)
+        page = await get_materials_by_teacher(teacher_id, limit, after)
         
         return {
             "teacher_id": teacher_id,
-            "materials": materials
+            "materials": page["items"],
+            "next_after": page["next_after"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
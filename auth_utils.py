@@ -5,17 +5,60 @@ from passlib.context import CryptContext
 from datetime import datetime, timedelta
 from typing import Optional
 import os
+import time
+import logging
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from utils.cache import TTLCache
 
 load_dotenv()
 
+# Token checks run on every request: sample them with LOG_SAMPLE_RATES="auth_utils=0.01"
+logger = logging.getLogger(__name__)
+
 # JWT Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Verified token claims, keyed by a digest of the token (never the token itself).
+# Entries never outlive the token's own "exp".
+TOKEN_CACHE_MAX_ENTRIES = int(os.getenv("TOKEN_CACHE_MAX_ENTRIES", "10000"))
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+_token_cache = TTLCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
+
+# Password hashing. Hashes below BCRYPT_ROUNDS are upgraded on the next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS
+)
+
+# bcrypt runs on its own small thread pool (it releases the GIL) so a login
+# spike never blocks the event loop; beyond BCRYPT_MAX_PENDING waiting or
+# running jobs new requests are refused instead of queueing without bound
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(4, os.cpu_count() or 1))))
+BCRYPT_MAX_PENDING = int(os.getenv("BCRYPT_MAX_PENDING", "64"))
+
+_hash_executor = None
+_hash_stats_lock = threading.Lock()
+_hash_stats = {
+    "waiting": 0,
+    "running": 0,
+    "completed": 0,
+    "rejected": 0,
+    "max_waiting": 0,
+    "wait_seconds_total": 0.0,
+    "run_seconds_total": 0.0
+}
+
+class PasswordHashingBusyError(RuntimeError):
+    """Raised when the password hashing queue is full."""
 
 # Security scheme
 security = HTTPBearer()
@@ -28,6 +71,73 @@ def get_password_hash(password: str) -> str:
     """Hash a password."""
     return pwd_context.hash(password)
 
+def _get_hash_executor() -> ThreadPoolExecutor:
+    """Return the shared bcrypt pool, starting it on first use."""
+    global _hash_executor
+    if _hash_executor is None:
+        _hash_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+    return _hash_executor
+
+def shutdown_hash_executor():
+    """Stop the bcrypt pool (called on application shutdown)."""
+    global _hash_executor
+    if _hash_executor is not None:
+        _hash_executor.shutdown(wait=False, cancel_futures=True)
+        _hash_executor = None
+
+async def _run_in_hash_pool(func, *args):
+    """Run a bcrypt call on the hashing pool, keeping queue metrics."""
+    with _hash_stats_lock:
+        if _hash_stats["waiting"] + _hash_stats["running"] >= BCRYPT_MAX_PENDING:
+            _hash_stats["rejected"] += 1
+            raise PasswordHashingBusyError("Too many password operations in progress")
+        _hash_stats["waiting"] += 1
+        _hash_stats["max_waiting"] = max(_hash_stats["max_waiting"], _hash_stats["waiting"])
+    submitted = time.perf_counter()
+
+    def job():
+        started = time.perf_counter()
+        with _hash_stats_lock:
+            _hash_stats["waiting"] -= 1
+            _hash_stats["running"] += 1
+            _hash_stats["wait_seconds_total"] += started - submitted
+        try:
+            return func(*args)
+        finally:
+            with _hash_stats_lock:
+                _hash_stats["running"] -= 1
+                _hash_stats["completed"] += 1
+                _hash_stats["run_seconds_total"] += time.perf_counter() - started
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_hash_executor(), job)
+
+async def hash_password(password: str) -> str:
+    """Hash a password on the bcrypt pool."""
+    return await _run_in_hash_pool(pwd_context.hash, password)
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple:
+    """
+    Verify a password on the bcrypt pool.
+    Returns (is_valid, new_hash); new_hash is set when the stored hash uses
+    an outdated cost and should be replaced.
+    """
+    return await _run_in_hash_pool(pwd_context.verify_and_update, plain_password, hashed_password)
+
+def get_password_hashing_stats() -> dict:
+    """Queue and timing metrics of the bcrypt pool."""
+    with _hash_stats_lock:
+        stats = dict(_hash_stats)
+    completed = stats["completed"]
+    stats.update({
+        "workers": BCRYPT_WORKERS,
+        "max_pending": BCRYPT_MAX_PENDING,
+        "rounds": BCRYPT_ROUNDS,
+        "avg_wait_ms": round(stats["wait_seconds_total"] / completed * 1000, 2) if completed else 0,
+        "avg_run_ms": round(stats["run_seconds_total"] / completed * 1000, 2) if completed else 0
+    })
+    return stats
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
     to_encode = data.copy()
@@ -40,41 +150,66 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Verify JWT token and return user data."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
+def _decode_token(token: str) -> Optional[tuple]:
+    """
+    Decode and validate a JWT. Returns (user claims, seconds they may be
+    cached for), or None if the token is invalid, expired or missing the
+    user id or email.
+    """
     try:
-        print(f"🔐 Verifying token: {credentials.credentials[:50]}...")
-        
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        email: str = payload.get("email")
-        role: str = payload.get("role")
-        
-        print(f"✅ Token decoded - User: {email}, Role: {role}")
-        
-        if user_id is None or email is None:
-            print("❌ Token missing user_id or email")
-            raise credentials_exception
-            
-        return {
-            "user_id": user_id,
-            "email": email,
-            "role": role
-        }
-    except JWTError as e:
-        print(f"❌ JWT Error: {e}")
-        raise credentials_exception
-    except Exception as e:
-        print(f"❌ Unexpected error in token verification: {e}")
-        raise credentials_exception
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+    user_id: str = payload.get("sub")
+    email: str = payload.get("email")
+    if user_id is None or email is None:
+        return None
+
+    claims = {
+        "user_id": user_id,
+        "email": email,
+        "role": payload.get("role")
+    }
+
+    ttl = TOKEN_CACHE_TTL_SECONDS
+    if payload.get("exp") is not None:
+        ttl = min(ttl, float(payload["exp"]) - time.time())
+    return claims, ttl
+
+def clear_token_cache():
+    """
+    Forget every verified token (e.g. after rotating JWT_SECRET_KEY in tests).
+    """
+    _token_cache.clear()
+
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Verify JWT token and return user data."""
+    token = credentials.credentials
+    cache_key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    claims = _token_cache.get(cache_key)
+    cached = claims is not None
+    if claims is None:
+        decoded = _decode_token(token)
+        if decoded is None:
+            logger.debug("Token rejected")
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        claims, ttl = decoded
+        if ttl > 0:
+            _token_cache.set(cache_key, claims, ttl_seconds=ttl)
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Token verified", extra={"user_id": claims["user_id"], "cached": cached})
+
+    # Callers get their own copy so the cached claims cannot be modified
+    return dict(claims)
+
 # Role-based dependencies
-def require_teacher(user_data: dict = Depends(verify_token)):
+async def require_teacher(user_data: dict = Depends(verify_token)):
     """Ensure user is a teacher."""
     if user_data.get("role") != "teacher":
         raise HTTPException(
@@ -83,7 +218,7 @@ def require_teacher(user_data: dict = Depends(verify_token)):
         )
     return user_data
 
-def require_student(user_data: dict = Depends(verify_token)):
+async def require_student(user_data: dict = Depends(verify_token)):
     """Ensure user is a student."""
     if user_data.get("role") != "student":
         raise HTTPException(
@@ -92,6 +227,6 @@ def require_student(user_data: dict = Depends(verify_token)):
         )
     return user_data
 
-def require_authenticated(user_data: dict = Depends(verify_token)):
+async def require_authenticated(user_data: dict = Depends(verify_token)):
     """Ensure user is authenticated (any role)."""
     return user_data
\ No newline at end of file
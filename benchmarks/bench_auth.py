@@ -0,0 +1,46 @@
+import pytest
+from jose import jwt
+from fastapi.security import HTTPAuthorizationCredentials
+from auth_utils import (
+    BCRYPT_ROUNDS, SECRET_KEY, ALGORITHM,
+    get_password_hash, verify_password, create_access_token, verify_token, clear_token_cache
+)
+
+CLAIMS = {"sub": "64b7f0c2a1e4c3d2b1a09876", "email": "student@example.com", "role": "student"}
+
+@pytest.fixture(scope="module")
+def password_hash():
+    return get_password_hash("correct horse battery staple")
+
+def bench_bcrypt_hash(benchmark):
+    benchmark.extra_info["rounds"] = BCRYPT_ROUNDS
+    hashed = benchmark.pedantic(get_password_hash, args=("correct horse battery staple",), rounds=5)
+    assert hashed.startswith("$2b$")
+
+def bench_bcrypt_verify(benchmark, password_hash):
+    benchmark.extra_info["rounds"] = BCRYPT_ROUNDS
+    assert benchmark.pedantic(verify_password, args=("correct horse battery staple", password_hash), rounds=5)
+
+def bench_jwt_encode(benchmark):
+    token = benchmark(create_access_token, CLAIMS)
+    assert token.count(".") == 2
+
+def bench_jwt_decode(benchmark):
+    token = create_access_token(CLAIMS)
+    payload = benchmark(jwt.decode, token, SECRET_KEY, algorithms=[ALGORITHM])
+    assert payload["sub"] == CLAIMS["sub"]
+
+def bench_verify_token_uncached(benchmark, run):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(CLAIMS))
+
+    def verify():
+        clear_token_cache()
+        return run(verify_token, credentials)
+
+    assert benchmark(verify)["user_id"] == CLAIMS["sub"]
+
+def bench_verify_token_cached(benchmark, run):
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=create_access_token(CLAIMS))
+    clear_token_cache()
+    run(verify_token, credentials)
+    assert benchmark(run, verify_token, credentials)["user_id"] == CLAIMS["sub"]
@@ -0,0 +1,43 @@
+from services.monitoring_tools import (
+    generate_recommendations, get_attendance_stats, get_section_attendance_stats, get_grade_summary, record_grade
+)
+from services.student_rollups import compute_rollups, get_student_rollups, ROLLUP_FIELDS
+
+# Served from the rollups
+def bench_generate_recommendations(benchmark, run, monitoring_data):
+    recommendations = benchmark(run, generate_recommendations, monitoring_data[0])
+    assert recommendations
+
+def bench_grade_summary(benchmark, run, monitoring_data):
+    summary = benchmark(run, get_grade_summary, monitoring_data[0])
+    assert summary["grade_count"] > 0
+
+def bench_attendance_stats(benchmark, run, monitoring_data):
+    stats = benchmark(run, get_attendance_stats, monitoring_data[0])
+    assert stats["total_classes"] > 0
+
+# Aggregated from the raw attendance rows
+def bench_attendance_stats_date_range(benchmark, run, monitoring_data):
+    stats = benchmark(run, get_attendance_stats, monitoring_data[0], "2024-09-01", "2024-09-30")
+    assert stats["total_classes"] > 0
+
+def bench_section_attendance_stats(benchmark, run, monitoring_data):
+    rows = benchmark(run, get_section_attendance_stats, "A", "2024-09-01", "2024-09-30")
+    assert rows
+
+# Write path: re-grading a quiz, moving it to another subject and back
+def bench_record_regrade(benchmark, run, monitoring_data):
+    student = monitoring_data[1]
+
+    def regrade():
+        for score, subject in ((98.5, "Physics"), (35.0, "Mathematics")):
+            run(record_grade, student, "quiz_0000", score, subject)
+
+    benchmark(regrade)
+
+    # The incremental rollups must still match a recomputation
+    expected = run(compute_rollups, [student])
+    for rollup in run(get_student_rollups, student):
+        fresh = expected[(student, rollup["subject"])]
+        for field in ROLLUP_FIELDS:
+            assert rollup.get(field) == fresh.get(field), (rollup["subject"], field)
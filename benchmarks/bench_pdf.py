@@ -0,0 +1,23 @@
+import pytest
+from services.pdf_extractor import extract_text_from_pdf, get_pdf_info, shutdown_pdf_pool
+from benchmarks.datasets import PDF_PAGE_COUNTS
+
+@pytest.fixture(scope="module", autouse=True)
+def pdf_pool():
+    yield
+    shutdown_pdf_pool()
+
+@pytest.mark.parametrize("pages", PDF_PAGE_COUNTS)
+def bench_extract_text_from_pdf(benchmark, pdf_documents, pages):
+    pdf_data = pdf_documents[pages]
+    # Start the worker pool outside the measurement
+    assert extract_text_from_pdf(pdf_data)
+    benchmark.extra_info["pages"] = pages
+    text = benchmark(extract_text_from_pdf, pdf_data)
+    assert f"Lecture page {pages}" in text
+
+@pytest.mark.parametrize("pages", PDF_PAGE_COUNTS)
+def bench_get_pdf_info(benchmark, pdf_documents, pages):
+    benchmark.extra_info["pages"] = pages
+    info = benchmark(get_pdf_info, pdf_documents[pages])
+    assert info["is_valid"] and info["page_count"] == pages
@@ -0,0 +1,50 @@
+import pytest
+from utils.llm_templates import (
+    generate_quiz_prompt, generate_summary_prompt, generate_section_summary_prompt, generate_combined_summary_prompt
+)
+from utils.text_chunker import split_text_into_chunks
+from utils.passage_retrieval import select_passages
+from benchmarks.datasets import make_lecture_text
+
+# Material sizes in characters: a short handout, a lecture, a long PDF
+MATERIAL_SIZES = (2_000, 50_000, 500_000)
+
+@pytest.fixture(scope="module")
+def materials():
+    return {size: make_lecture_text(size) for size in MATERIAL_SIZES}
+
+@pytest.mark.parametrize("size", MATERIAL_SIZES)
+def bench_quiz_prompt(benchmark, materials, size):
+    prompt = benchmark(generate_quiz_prompt, "Mathematics", "intermediate", materials[size], 10)
+    assert len(prompt) > size
+
+@pytest.mark.parametrize("size", MATERIAL_SIZES)
+def bench_summary_prompt(benchmark, materials, size):
+    prompt = benchmark(generate_summary_prompt, "Mathematics", 3, materials[size])
+    assert len(prompt) > size
+
+def bench_section_prompts(benchmark, materials):
+    """
+    Map step of a long lecture: chunk the text and build one prompt per section.
+    """
+    def build():
+        sections = split_text_into_chunks(materials[500_000], 6000)
+        return [
+            generate_section_summary_prompt("Mathematics", 3, section, index, len(sections))
+            for index, section in enumerate(sections, start=1)
+        ]
+
+    prompts = benchmark(build)
+    assert len(prompts) > 1
+
+def bench_combined_summary_prompt(benchmark):
+    section_summaries = [make_lecture_text(1_500) for _ in range(40)]
+    prompt = benchmark(generate_combined_summary_prompt, "Mathematics", 3, section_summaries)
+    assert "SECTION 40:" in prompt
+
+def bench_select_passages(benchmark, materials):
+    """
+    Relevance ranking of a long material down to the quiz context budget.
+    """
+    text = benchmark(select_passages, materials[500_000], "Mathematics intermediate", 24000)
+    assert len(text) < 500_000
@@ -0,0 +1,46 @@
+import json
+import pytest
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from benchmarks.datasets import build_grades
+
+# Grades per list: one page, a section export, a whole term
+GRADE_LIST_SIZES = (200, 10_000, 50_000)
+
+@pytest.fixture(scope="module")
+def grade_lists():
+    lists = {}
+    for size in GRADE_LIST_SIZES:
+        grades = build_grades(size // 50, 50)
+        for grade in grades:
+            grade["_id"] = ObjectId()
+        lists[size] = grades
+    return lists
+
+def _fresh_copy(grades: list):
+    # The conversion rewrites _id in place, like paginate() does
+    return ([dict(grade) for grade in grades],), {}
+
+def _to_response(grades: list) -> bytes:
+    """
+    What a grade list costs to send: _id to string as in paginate(),
+    then FastAPI's jsonable_encoder and the JSON response rendering.
+    """
+    for grade in grades:
+        grade["_id"] = str(grade["_id"])
+    return JSONResponse(jsonable_encoder({"items": grades, "next_after": None})).body
+
+@pytest.mark.parametrize("size", GRADE_LIST_SIZES)
+def bench_grades_to_json(benchmark, grade_lists, size):
+    benchmark.extra_info["grades"] = size
+    rounds = 50 if size <= 10_000 else 10
+    body = benchmark.pedantic(_to_response, setup=lambda: _fresh_copy(grade_lists[size]), rounds=rounds)
+    assert json.loads(body)["items"][0]["_id"] == str(grade_lists[size][0]["_id"])
+
+@pytest.mark.parametrize("size", GRADE_LIST_SIZES)
+def bench_object_ids_to_str(benchmark, grade_lists, size):
+    benchmark.extra_info["grades"] = size
+    object_ids = [grade["_id"] for grade in grade_lists[size]]
+    strings = benchmark(lambda: [str(object_id) for object_id in object_ids])
+    assert len(strings) == size
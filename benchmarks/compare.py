@@ -0,0 +1,103 @@
+"""
+Compare two pytest-benchmark JSON files and flag regressions.
+
+    python benchmarks/compare.py benchmarks/baseline.json benchmarks/results/latest.json
+    python benchmarks/compare.py OLD NEW --threshold 0.10 --stat mean
+
+A benchmark regresses when its statistic (median by default, the least
+sensitive to outliers) grew by more than the threshold. Exits with 1 when
+anything regressed, so it can gate CI. Only compare runs from the same
+machine: the numbers are wall-clock times.
+"""
+import sys
+import json
+import argparse
+
+DEFAULT_THRESHOLD = 0.15
+STATS = ("min", "median", "mean")
+
+def load_results(path: str) -> tuple:
+    """
+    Returns ({fullname: stats dict}, machine_info dict) for a --benchmark-json file.
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {entry["fullname"]: entry["stats"] for entry in data.get("benchmarks", [])}, data.get("machine_info", {})
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD, stat: str = "median") -> list:
+    """
+    One row per benchmark: {"name", "baseline", "current", "change", "status"}
+    where status is "regressed", "improved", "ok", "new" or "missing".
+    """
+    rows = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in baseline:
+            rows.append({"name": name, "baseline": None, "current": current[name][stat], "change": None, "status": "new"})
+            continue
+        if name not in current:
+            rows.append({"name": name, "baseline": baseline[name][stat], "current": None, "change": None, "status": "missing"})
+            continue
+
+        before, after = baseline[name][stat], current[name][stat]
+        change = (after - before) / before if before > 0 else 0.0
+        if change > threshold:
+            status = "regressed"
+        elif change < -threshold:
+            status = "improved"
+        else:
+            status = "ok"
+        rows.append({"name": name, "baseline": before, "current": after, "change": change, "status": status})
+    return rows
+
+def _format_time(seconds) -> str:
+    if seconds is None:
+        return "-"
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.2f} us"
+
+def format_report(rows: list, stat: str, threshold: float) -> str:
+    width = max([len(row["name"]) for row in rows] + [9])
+    lines = [
+        f"{'benchmark':<{width}}  {'baseline':>12}  {'current':>12}  {'change':>8}  status",
+        "-" * (width + 48)
+    ]
+    for row in rows:
+        change = f"{row['change'] * 100:+.1f}%" if row["change"] is not None else "-"
+        lines.append(
+            f"{row['name']:<{width}}  {_format_time(row['baseline']):>12}  {_format_time(row['current']):>12}  {change:>8}  {row['status']}"
+        )
+
+    regressed = [row for row in rows if row["status"] == "regressed"]
+    lines.append("")
+    lines.append(f"{len(regressed)} regression(s) over {threshold * 100:.0f}% ({stat}) in {len(rows)} benchmarks")
+    return "\n".join(lines)
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Flag benchmark regressions against a stored baseline.")
+    parser.add_argument("baseline", help="pytest-benchmark JSON to compare against")
+    parser.add_argument("current", help="pytest-benchmark JSON of the new run")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown as a fraction (default 0.15)")
+    parser.add_argument("--stat", choices=STATS, default="median", help="statistic to compare (default median)")
+    args = parser.parse_args(argv)
+
+    try:
+        baseline, baseline_machine = load_results(args.baseline)
+        current, current_machine = load_results(args.current)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"❌ Cannot read benchmark results: {e}")
+        return 2
+
+    before_cpu = baseline_machine.get("cpu", {}).get("brand_raw")
+    after_cpu = current_machine.get("cpu", {}).get("brand_raw")
+    if before_cpu != after_cpu:
+        print(f"⚠️ Results come from different CPUs ({before_cpu} vs {after_cpu}); timings are not comparable")
+
+    rows = compare_results(baseline, current, args.threshold, args.stat)
+    print(format_report(rows, args.stat, args.threshold))
+    return 1 if any(row["status"] == "regressed" for row in rows) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""
+Shared benchmark fixtures.
+
+The benchmarks run offline: Motor is replaced by mongomock_motor before
+config is imported, so every service talks to an in-memory database
+seeded once per session. Dev-only dependencies (not used by the app):
+
+    pip install pytest-benchmark mongomock-motor
+"""
+import os
+import asyncio
+import pytest
+
+# Keep log output (and the log queue) out of the measurements
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("DATABASE_NAME", "benchmarks")
+
+import motor.motor_asyncio
+from mongomock_motor import AsyncMongoMockClient
+
+motor.motor_asyncio.AsyncIOMotorClient = AsyncMongoMockClient
+# GridFS is not exercised by the benchmarks
+motor.motor_asyncio.AsyncIOMotorGridFSBucket = lambda db: None
+
+import config
+from benchmarks.datasets import (
+    BENCH_STUDENTS, BENCH_GRADES_PER_STUDENT, BENCH_ATTENDANCE_DAYS, PDF_PAGE_COUNTS,
+    build_grades, build_attendance, make_pdf, student_id
+)
+
+@pytest.fixture(scope="session")
+def event_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="session")
+def run(event_loop):
+    """
+    Run a coroutine function to completion: benchmark(run, func, *args).
+    """
+    def run_coroutine(func, *args, **kwargs):
+        return event_loop.run_until_complete(func(*args, **kwargs))
+    return run_coroutine
+
+@pytest.fixture(scope="session")
+def monitoring_data(run):
+    """
+    Seed grades and attendance for BENCH_STUDENTS students and build
+    their rollups. Returns the seeded student ids.
+    """
+    from services.student_rollups import rebuild_rollups
+
+    async def seed():
+        await config.grades_collection.delete_many({})
+        await config.attendance_collection.delete_many({})
+        await config.student_rollups_collection.delete_many({})
+        await config.grades_collection.insert_many(build_grades(BENCH_STUDENTS, BENCH_GRADES_PER_STUDENT))
+        await config.attendance_collection.insert_many(build_attendance(BENCH_STUDENTS, BENCH_ATTENDANCE_DAYS))
+        await rebuild_rollups()
+
+    run(seed)
+    return [student_id(s) for s in range(BENCH_STUDENTS)]
+
+@pytest.fixture(scope="session")
+def pdf_documents():
+    """
+    Generated PDFs keyed by page count.
+    """
+    return {pages: make_pdf(pages) for pages in PDF_PAGE_COUNTS}
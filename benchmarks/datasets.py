@@ -0,0 +1,136 @@
+"""
+Deterministic benchmark inputs: grade and attendance documents shaped like
+the services write them, and text PDFs of any page count built without a
+PDF library (a few lines of Helvetica text per page plus an /Info
+dictionary, like real uploads have).
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+# Seeded dataset
+BENCH_STUDENTS = int(os.getenv("BENCH_STUDENTS", "200"))
+BENCH_GRADES_PER_STUDENT = int(os.getenv("BENCH_GRADES_PER_STUDENT", "50"))
+BENCH_ATTENDANCE_DAYS = int(os.getenv("BENCH_ATTENDANCE_DAYS", "60"))
+BENCH_SUBJECTS = ("Mathematics", "Physics", "Chemistry", "Biology", "History")
+BENCH_SECTIONS = ("A", "B", "C", "D")
+
+# Page counts the extraction benchmarks run against
+PDF_PAGE_COUNTS = (1, 50, 500)
+LINES_PER_PAGE = 12
+
+_SENTENCES = (
+    "The derivative measures the rate of change of a function.",
+    "Integration is the inverse operation of differentiation.",
+    "A limit describes the value a function approaches near a point.",
+    "The chain rule differentiates compositions of functions.",
+    "Photosynthesis converts light energy into chemical energy.",
+    "Newton's second law relates force, mass and acceleration."
+)
+
+def student_id(index: int) -> str:
+    return f"student_{index:05d}"
+
+def build_grades(student_count: int, per_student: int, seed: int = 7) -> list:
+    """
+    Grade documents shaped like record_grade writes them.
+    """
+    rng = random.Random(seed)
+    started = datetime(2024, 9, 1)
+    grades = []
+    for s in range(student_count):
+        for g in range(per_student):
+            grades.append({
+                "student_id": student_id(s),
+                "quiz_id": f"quiz_{g:04d}",
+                "grade": round(min(100.0, max(0.0, rng.gauss(72, 15))), 1),
+                "subject": BENCH_SUBJECTS[g % len(BENCH_SUBJECTS)],
+                "section": BENCH_SECTIONS[s % len(BENCH_SECTIONS)],
+                "feedback": None,
+                "timestamp": started + timedelta(hours=g * 6)
+            })
+    return grades
+
+def build_attendance(student_count: int, days: int, seed: int = 11) -> list:
+    """
+    Attendance documents shaped like mark_attendance writes them.
+    """
+    rng = random.Random(seed)
+    started = datetime(2024, 9, 1)
+    attendance = []
+    for s in range(student_count):
+        for d in range(days):
+            date = started + timedelta(days=d)
+            attendance.append({
+                "student_id": student_id(s),
+                "date": date.strftime("%Y-%m-%d"),
+                "status": "present" if rng.random() < 0.9 else "absent",
+                "subject": BENCH_SUBJECTS[d % len(BENCH_SUBJECTS)],
+                "section": BENCH_SECTIONS[s % len(BENCH_SECTIONS)],
+                "marked_by": "teacher_bench",
+                "marked_at": date
+            })
+    return attendance
+
+def make_lecture_text(length: int) -> str:
+    """
+    Plain lecture text of exactly length characters, in paragraphs.
+    """
+    sentences = []
+    size = 0
+    index = 0
+    while size < length:
+        sentence = _SENTENCES[index % len(_SENTENCES)]
+        sentences.append(sentence + ("\n\n" if index % 8 == 7 else " "))
+        size += len(sentences[-1])
+        index += 1
+    return "".join(sentences)[:length]
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def _page_content(page_number: int) -> str:
+    lines = [f"Lecture page {page_number + 1}"]
+    lines += [_SENTENCES[(page_number + i) % len(_SENTENCES)] for i in range(LINES_PER_PAGE - 1)]
+    commands = ["BT", "/F1 11 Tf", "14 TL", "72 740 Td"]
+    for line in lines:
+        commands.append(f"({_escape(line)}) Tj T*")
+    commands.append("ET")
+    return "\n".join(commands)
+
+def make_pdf(page_count: int) -> bytes:
+    """
+    Build a valid PDF with page_count pages of lecture-like text.
+    """
+    # 1 catalog, 2 page tree, 3 font, 4 info, then a page and its content stream per page
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [{}] /Count {} >>".format(
+            " ".join(f"{5 + 2 * i} 0 R" for i in range(page_count)), page_count
+        ),
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+        "<< /Title (Benchmark lecture) /Author (Benchmarks) >>"
+    ]
+    for i in range(page_count):
+        content = _page_content(i)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {6 + 2 * i} 0 R "
+            "/Resources << /Font << /F1 3 0 R >> >> >>"
+        )
+        objects.append(f"<< /Length {len(content)} >>\nstream\n{content}\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+
+    xref_offset = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode("latin-1")
+    output += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R /Info 4 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode("latin-1")
+    return bytes(output)
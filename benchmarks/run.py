@@ -0,0 +1,53 @@
+"""
+Run the benchmark suite and save the results as JSON.
+
+    python benchmarks/run.py                    # results/latest.json, compared with baseline.json if present
+    python benchmarks/run.py --save-baseline    # also store this run as the new baseline
+    python benchmarks/run.py -k pdf             # extra arguments go to pytest
+
+Each run is written to benchmarks/results/<timestamp>.json and copied to
+benchmarks/results/latest.json. The baseline (benchmarks/baseline.json)
+should be recorded on the machine that runs the comparison.
+"""
+import os
+import sys
+import shutil
+import argparse
+from datetime import datetime
+import pytest
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, "results")
+BASELINE_PATH = os.path.join(BENCHMARKS_DIR, "baseline.json")
+
+sys.path.insert(0, os.path.dirname(BENCHMARKS_DIR))
+from benchmarks.compare import DEFAULT_THRESHOLD, main as compare_main
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the benchmarks and compare them with the baseline.")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as benchmarks/baseline.json")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown as a fraction (default 0.15)")
+    args, pytest_args = parser.parse_known_args(argv)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    output = os.path.join(RESULTS_DIR, datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    exit_code = pytest.main([BENCHMARKS_DIR, f"--benchmark-json={output}", *pytest_args])
+    if exit_code != 0:
+        return exit_code
+
+    latest = os.path.join(RESULTS_DIR, "latest.json")
+    shutil.copyfile(output, latest)
+    print(f"✅ Results saved to {output}")
+
+    if args.save_baseline:
+        shutil.copyfile(output, BASELINE_PATH)
+        print(f"✅ Baseline updated: {BASELINE_PATH}")
+        return 0
+
+    if not os.path.exists(BASELINE_PATH):
+        print("ℹ️ No baseline yet, record one with --save-baseline")
+        return 0
+    return compare_main([BASELINE_PATH, latest, "--threshold", str(args.threshold)])
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,27 +1,36 @@
 import os
+import logging
 import firebase_admin
 from firebase_admin import credentials
 from dotenv import load_dotenv
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from utils.metrics import MongoCommandListener
 
 
 load_dotenv()
 
+# Every entry point imports config first, so logging is set up here
+from utils.logging_config import setup_logging
+setup_logging()
+logger = logging.getLogger(__name__)
+
 # Initialize Firebase Admin
 firebase_credentials_path = os.getenv("FIREBASE_SERVICE_ACCOUNT")
 if firebase_credentials_path and os.path.exists(firebase_credentials_path):
     cred = credentials.Certificate(firebase_credentials_path)
     if not firebase_admin._apps:
         firebase_admin.initialize_app(cred)
-    print("✅ Firebase Admin initialized successfully")
+    logger.info("Firebase Admin initialized")
 else:
-    print("⚠️  Firebase credentials not found - authentication will be disabled")
+    logger.warning("Firebase credentials not found - authentication will be disabled")
 
 # MongoDB Connection
 mongodb_uri = os.getenv("MONGODB_URI")
 database_name = os.getenv("DATABASE_NAME", "educational_assistant")
-print(f"🔗 Connecting to MongoDB: {database_name}")
-client = MongoClient(mongodb_uri)
+logger.info("Connecting to MongoDB", extra={"database": database_name})
+# Motor (asyncio) client: every data access is awaited so database latency
+# never blocks the event loop; every command is timed for /metrics
+client = AsyncIOMotorClient(mongodb_uri, event_listeners=[MongoCommandListener()])
 db = client[database_name]
 
 # Collections
@@ -31,6 +40,21 @@ summaries_collection = db["summaries"]
 grades_collection = db["grades"]
 attendance_collection = db["attendance"]
 users_collection = db["users"]
+llm_cache_collection = db["llm_cache"]
+material_texts_collection = db["material_texts"]
+recommendations_collection = db["recommendations"]
+student_rollups_collection = db["student_rollups"]
+quiz_jobs_collection = db["quiz_jobs"]
+
+# GridFS (material files)
+fs_bucket = AsyncIOMotorGridFSBucket(db)
+fs_files_collection = db["fs.files"]
+fs_chunks_collection = db["fs.chunks"]
+
+# Largest material upload accepted (GridFS itself has no limit, this keeps uploads sane)
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_MB", "16")) * 1024 * 1024
+# Largest gradebook / roll call file accepted by the streaming bulk import routes
+MAX_BULK_IMPORT_BYTES = int(os.getenv("MAX_BULK_IMPORT_MB", "512")) * 1024 * 1024
 
 # Gemini API key (for reference - actual config is in gemini_client.py)
 gemini_api_key = os.getenv("GEMINI_API_KEY") # ← Set the API key
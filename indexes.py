@@ -0,0 +1,226 @@
+"""
+MongoDB index registry.
+
+Every index the services rely on is declared here. ensure_indexes() creates
+them at startup and check_index_drift() reports differences between this
+registry and the live database. explain_queries() runs explain() on the hot
+service queries and flags collection scans.
+
+    python -m indexes --ensure    create missing indexes
+    python -m indexes --check     report drift only
+    python -m indexes --explain   explain() every registered query
+"""
+import sys
+import asyncio
+from pymongo import IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import OperationFailure
+from config import db
+from utils.llm_cache import LLM_CACHE_TTL_SECONDS
+
+INDEXES = {
+    "users": [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+    ],
+    "materials": [
+        IndexModel([("material_id", ASCENDING)], name="material_id_unique", unique=True),
+        # Keyset pagination: equality prefix + _id (see utils/pagination.py)
+        IndexModel([("section", ASCENDING), ("_id", DESCENDING)], name="section_id"),
+        IndexModel([("teacher_id", ASCENDING), ("_id", DESCENDING)], name="teacher_id_id"),
+        IndexModel([("content_hash", ASCENDING)], name="content_hash"),
+    ],
+    "material_texts": [
+        IndexModel([("content_hash", ASCENDING)], name="content_hash_unique", unique=True),
+    ],
+    "quizzes": [
+        IndexModel([("quiz_id", ASCENDING)], name="quiz_id_unique", unique=True),
+        IndexModel([("teacher_id", ASCENDING), ("created_at", DESCENDING)], name="teacher_id_created_at"),
+    ],
+    "quiz_jobs": [
+        IndexModel([("job_id", ASCENDING)], name="job_id_unique", unique=True),
+        IndexModel([("teacher_id", ASCENDING), ("_id", DESCENDING)], name="teacher_id_id"),
+        IndexModel([("status", ASCENDING), ("heartbeat_at", ASCENDING)], name="status_heartbeat_at"),
+        IndexModel([("owner", ASCENDING), ("status", ASCENDING)], name="owner_status"),
+        # Set when a job finishes (QUIZ_JOB_RETENTION_DAYS later)
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "summaries": [
+        IndexModel([("summary_id", ASCENDING)], name="summary_id_unique", unique=True),
+        IndexModel([("student_id", ASCENDING), ("_id", DESCENDING)], name="student_id_id"),
+    ],
+    # Not unique: the teacher grade route still inserts repeated demo quiz entries
+    "grades": [
+        IndexModel([("student_id", ASCENDING), ("quiz_id", ASCENDING)], name="student_id_quiz_id"),
+        IndexModel([("student_id", ASCENDING), ("_id", DESCENDING)], name="student_id_id"),
+        IndexModel([("subject", ASCENDING)], name="subject"),
+        IndexModel([("section", ASCENDING), ("subject", ASCENDING)], name="section_subject"),
+    ],
+    # Not unique: the teacher attendance route inserts one row per call
+    "attendance": [
+        IndexModel([("student_id", ASCENDING), ("date", ASCENDING)], name="student_id_date"),
+        IndexModel([("student_id", ASCENDING), ("_id", DESCENDING)], name="student_id_id"),
+        IndexModel([("date", ASCENDING), ("section", ASCENDING)], name="date_section"),
+        IndexModel([("section", ASCENDING), ("date", ASCENDING)], name="section_date"),
+    ],
+    "recommendations": [
+        IndexModel([("student_id", ASCENDING), ("generated_at", DESCENDING)], name="student_id_generated_at"),
+    ],
+    "student_rollups": [
+        IndexModel([("student_id", ASCENDING), ("subject", ASCENDING)], name="student_id_subject_unique", unique=True),
+        IndexModel([("updated_at", ASCENDING)], name="updated_at"),
+    ],
+    "llm_cache": [
+        IndexModel([("cache_key", ASCENDING)], name="cache_key_unique", unique=True),
+        IndexModel([("created_at", ASCENDING)], name="created_at_ttl", expireAfterSeconds=LLM_CACHE_TTL_SECONDS),
+    ],
+    # Content-addressed GridFS files (legacy files without a hash are skipped).
+    # The driver creates filename_1_uploadDate_1 and files_id_1_n_1 itself on the
+    # first upload; they are declared with its names and options so they are not drift.
+    "fs.files": [
+        IndexModel([("filename", ASCENDING), ("uploadDate", ASCENDING)], name="filename_1_uploadDate_1"),
+        IndexModel(
+            [("metadata.sha256", ASCENDING)],
+            name="metadata_sha256_unique",
+            unique=True,
+            partialFilterExpression={"metadata.sha256": {"$type": "string"}}
+        ),
+    ],
+    "fs.chunks": [
+        IndexModel([("files_id", ASCENDING), ("n", ASCENDING)], name="files_id_1_n_1", unique=True),
+    ],
+}
+
+# Representative service queries checked by explain_queries():
+# (name, collection, filter, sort)
+QUERIES = [
+    ("login by email", "users", {"email": "probe@example.com"}, None),
+    ("user by id", "users", {"user_id": "probe"}, None),
+    ("material by id", "materials", {"material_id": "probe"}, None),
+    ("materials by section", "materials", {"section": "probe"}, [("_id", DESCENDING)]),
+    ("materials by teacher", "materials", {"teacher_id": "probe"}, [("_id", DESCENDING)]),
+    ("material text by hash", "material_texts", {"content_hash": "probe"}, None),
+    ("quiz by id", "quizzes", {"quiz_id": "probe"}, None),
+    ("quiz job by id", "quiz_jobs", {"job_id": "probe"}, None),
+    ("quiz jobs by teacher", "quiz_jobs", {"teacher_id": "probe"}, [("_id", DESCENDING)]),
+    ("abandoned quiz jobs", "quiz_jobs", {"status": {"$in": ["queued", "running"]}, "heartbeat_at": {"$lt": "probe"}}, None),
+    ("quiz job heartbeat", "quiz_jobs", {"owner": "probe", "status": {"$in": ["queued", "running"]}}, None),
+    ("summaries by student", "summaries", {"student_id": "probe"}, [("_id", DESCENDING)]),
+    ("grades by student", "grades", {"student_id": "probe"}, [("_id", DESCENDING)]),
+    ("grade upsert key", "grades", {"student_id": "probe", "quiz_id": "probe"}, None),
+    ("grades by subject", "grades", {"subject": "probe"}, None),
+    ("class grades", "grades", {"section": "probe", "subject": "probe"}, None),
+    ("attendance by student", "attendance", {"student_id": "probe"}, [("_id", DESCENDING)]),
+    ("attendance upsert key", "attendance", {"student_id": "probe", "date": "2024-01-01"}, None),
+    ("attendance by date", "attendance", {"date": "2024-01-01", "section": "probe"}, None),
+    ("attendance by section", "attendance", {"section": "probe", "date": {"$gte": "2024-01-01"}}, None),
+    ("latest recommendations", "recommendations", {"student_id": "probe"}, [("generated_at", DESCENDING)]),
+    ("student rollups", "student_rollups", {"student_id": "probe"}, [("subject", ASCENDING)]),
+    ("student rollup", "student_rollups", {"student_id": "probe", "subject": "probe"}, None),
+    ("llm cache lookup", "llm_cache", {"cache_key": "probe"}, None),
+    ("gridfs by content hash", "fs.files", {"metadata.sha256": "probe"}, None),
+]
+
+def _index_options(document: dict) -> dict:
+    """
+    The options that matter when comparing a declared index with a live one.
+    """
+    return {
+        "key": list(document["key"].items()) if hasattr(document["key"], "items") else list(document["key"]),
+        "unique": bool(document.get("unique", False)),
+        "expireAfterSeconds": document.get("expireAfterSeconds"),
+        "partialFilterExpression": document.get("partialFilterExpression"),
+    }
+
+async def ensure_indexes() -> list:
+    """
+    Create every declared index. Returns a list of error messages for
+    collections where creation failed (e.g. duplicates blocking a unique index).
+    """
+    errors = []
+    for collection_name, models in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(models)
+        except OperationFailure as e:
+            errors.append(f"{collection_name}: {e}")
+    return errors
+
+async def check_index_drift() -> list:
+    """
+    Compare the live indexes with INDEXES.
+    Returns a list of human readable drift messages (empty when in sync).
+    """
+    drift = []
+    for collection_name, models in INDEXES.items():
+        live = await db[collection_name].index_information()
+        live = {name: _index_options(info) for name, info in live.items() if name != "_id_"}
+
+        for model in models:
+            declared = model.document
+            name = declared["name"]
+            if name not in live:
+                drift.append(f"{collection_name}.{name}: missing")
+                continue
+
+            expected = _index_options(declared)
+            actual = live.pop(name)
+            for option, value in expected.items():
+                if actual[option] != value:
+                    drift.append(f"{collection_name}.{name}: {option} is {actual[option]!r}, expected {value!r}")
+
+        for name in live:
+            drift.append(f"{collection_name}.{name}: not declared in the registry")
+    return drift
+
+def _plan_stages(plan: dict):
+    """
+    Yield every stage name in an explain() winning plan tree.
+    """
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _plan_stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+async def explain_queries() -> list:
+    """
+    Run explain() on every registered query.
+    Returns [{"name", "collection", "stages", "collection_scan"}].
+    """
+    report = []
+    for name, collection_name, query, sort in QUERIES:
+        cursor = db[collection_name].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explanation = await cursor.explain()
+        stages = [stage for stage in _plan_stages(explanation["queryPlanner"]["winningPlan"]) if stage]
+        report.append({
+            "name": name,
+            "collection": collection_name,
+            "stages": stages,
+            "collection_scan": "COLLSCAN" in stages
+        })
+    return report
+
+async def _main(args: list) -> int:
+    if "--ensure" in args:
+        for error in await ensure_indexes():
+            print(f"❌ {error}")
+
+    if "--explain" in args:
+        scans = 0
+        for entry in await explain_queries():
+            marker = "❌ COLLSCAN" if entry["collection_scan"] else "✅"
+            print(f"{marker} {entry['collection']}: {entry['name']} -> {' > '.join(entry['stages'])}")
+            scans += entry["collection_scan"]
+        return 1 if scans else 0
+
+    drift = await check_index_drift()
+    for message in drift:
+        print(f"⚠️  {message}")
+    if not drift:
+        print("✅ Indexes match the registry")
+    return 1 if drift else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
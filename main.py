@@ -1,5 +1,7 @@
+import logging
 import uvicorn # ASGI server to run FastAPI apps
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from api.routes_teacher import router as teacher_router
 from api.routes_student import router as student_router
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,19 +9,64 @@ from api.routes_materials import router as materials_router
 from api.routes_student_materials import router as student_materials_router
 from api.routes_monitoring import router as monitoring_router
 from api.routes_auth import router as auth_router
+from indexes import ensure_indexes, check_index_drift
+from services.pdf_extractor import shutdown_pdf_pool
+from auth_utils import shutdown_hash_executor
+from services.quiz_jobs import fail_abandoned_jobs, stop_workers as stop_quiz_workers, get_quiz_job_stats
+from utils.request_limits import RequestSizeLimitMiddleware
+from config import MAX_BULK_IMPORT_BYTES
+from utils.request_context import RequestContextMiddleware
+from utils.logging_config import shutdown_logging
+from utils.metrics import MetricsMiddleware, register_collector, render_metrics
+from utils.llm_cache import get_cache_stats
+from utils.llm_providers import get_provider
+from auth_utils import get_password_hashing_stats
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(
 title="AI Learning Assistant",
 description="AI-powered app for generating quizzes and summarizing lectures",
 version="1.0.0"
 )
-# Debug: Print all routes on startup
+# Debug: log all routes on startup (LOG_LEVEL=DEBUG)
 @app.on_event("startup")
-async def print_routes():
-    print("🚀 REGISTERED ROUTES:")
+async def log_routes():
+    logger.debug("Registered routes")
     for route in app.routes:
         if hasattr(route, "methods") and hasattr(route, "path"):
-            print(f"  {list(route.methods)} {route.path}")
+            logger.debug("Route", extra={"methods": sorted(route.methods), "path": route.path})
+
+@app.on_event("startup")
+async def create_indexes():
+    try:
+        for error in await ensure_indexes():
+            logger.error("Index creation failed", extra={"error": error})
+        for message in await check_index_drift():
+            logger.warning("Index drift", extra={"drift": message})
+    except Exception as e:
+        logger.warning("Could not verify MongoDB indexes: %s", e)
+
+# Fail fast on an unknown LLM_PROVIDER instead of on the first quiz
+@app.on_event("startup")
+async def select_llm_provider():
+    provider = get_provider()
+    logger.info("LLM provider selected", extra={"provider": provider.name})
+
+# Jobs left unfinished by a crashed or killed process will never complete
+@app.on_event("startup")
+async def clean_up_quiz_jobs():
+    try:
+        await fail_abandoned_jobs()
+    except Exception as e:
+        logger.warning("Could not check for abandoned quiz jobs: %s", e)
+
+@app.on_event("shutdown")
+async def stop_worker_pools():
+    await stop_quiz_workers()
+    shutdown_pdf_pool()
+    shutdown_hash_executor()
+    shutdown_logging()
             
 #Enable CORS for frontend-backend communication
 app.add_middleware(
@@ -29,6 +76,15 @@ allow_credentials=True,
 allow_methods=["*"],
 allow_headers=["*"],
 )
+# Reject oversized uploads before their body is parsed; the bulk imports stream larger files
+app.add_middleware(RequestSizeLimitMiddleware, path_limits={
+    "/monitoring/grades/bulk": MAX_BULK_IMPORT_BYTES,
+    "/monitoring/attendance/bulk": MAX_BULK_IMPORT_BYTES
+})
+# Request count and latency per route template
+app.add_middleware(MetricsMiddleware)
+# Outermost: request ids and access logs cover every response, rejections included
+app.add_middleware(RequestContextMiddleware)
 #Register routers
 app.include_router(teacher_router, prefix="/api/teacher", tags=["Teacher"])
 app.include_router(student_router, prefix="/api/student", tags=["Student"])
@@ -40,6 +96,38 @@ app.include_router(auth_router, prefix="/api", tags=["Authentication"])
 @app.get("/")
 def root():
 	return {"message": "AI Learning Assistant is running"}
+
+def _collect_runtime_stats():
+	llm_cache = get_cache_stats()
+	hashing = get_password_hashing_stats()
+	quiz_jobs = get_quiz_job_stats()
+	return [
+		("llm_provider_info", "gauge", "Selected LLM backend (LLM_PROVIDER).", {"provider": get_provider().name}, 1)
+	] + [
+		("llm_cache_events_total", "counter", "LLM cache lookups and writes by outcome.", {"event": event}, llm_cache[event])
+		for event in ("memory_hits", "mongo_hits", "misses", "stores", "errors")
+	] + [
+		("llm_cache_memory_entries", "gauge", "Entries in the in-process LLM cache.", {}, llm_cache["memory_entries"]),
+		("password_hashing_waiting", "gauge", "bcrypt jobs waiting for a worker.", {}, hashing["waiting"]),
+		("password_hashing_running", "gauge", "bcrypt jobs running.", {}, hashing["running"]),
+		("password_hashing_completed_total", "counter", "bcrypt jobs completed.", {}, hashing["completed"]),
+		("password_hashing_rejected_total", "counter", "bcrypt jobs refused because the queue was full.", {}, hashing["rejected"]),
+		("password_hashing_wait_seconds_total", "counter", "Time bcrypt jobs spent waiting for a worker.", {}, hashing["wait_seconds_total"]),
+		("password_hashing_run_seconds_total", "counter", "Time bcrypt jobs spent hashing.", {}, hashing["run_seconds_total"]),
+		("quiz_jobs_queued", "gauge", "Quiz generation jobs waiting for a worker.", {}, quiz_jobs["queued"]),
+		("quiz_jobs_running", "gauge", "Quiz generation jobs running.", {}, quiz_jobs["running"]),
+		("quiz_jobs_workers", "gauge", "Quiz generation workers per process.", {}, quiz_jobs["workers"])
+	] + [
+		("quiz_jobs_total", "counter", "Quiz generation jobs by outcome.", {"outcome": outcome}, quiz_jobs[outcome])
+		for outcome in ("submitted", "succeeded", "failed", "rejected")
+	]
+
+register_collector(_collect_runtime_stats)
+
+#Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+	return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 #Run the app using uvicorn
 if __name__ == "__main__":
 	uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
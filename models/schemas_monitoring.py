@@ -1,16 +1,28 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, validator
 from typing import List, Optional
 from datetime import datetime
 class GradeEntry(BaseModel):
 	student_id: str = Field(..., example="student_123")
 	quiz_id: str = Field(..., example="quiz_456")
 	score: float = Field(..., ge=0.0, le=100.0, example=87.5)
-	submitted_at: datetime
+	subject: Optional[str] = Field(None, example="Mathematics")
+	section: Optional[str] = Field(None, example="A")
+	feedback: Optional[str] = None
+	submitted_at: Optional[datetime] = None
 
 class AttendanceEntry(BaseModel):
 	student_id: str = Field(..., example="student_123")
 	date: datetime
 	status: str = Field(..., example="present") # or "absent", "late"
+	subject: Optional[str] = Field(None, example="Mathematics")
+	section: Optional[str] = Field(None, example="A")
+
+	@validator("date", pre=True)
+	def accept_plain_dates(cls, value):
+		# Roll calls are usually exported as YYYY-MM-DD
+		if isinstance(value, str) and len(value) == 10:
+			return f"{value}T00:00:00"
+		return value
 
 class Recommendation(BaseModel):
 	student_id: str = Field(..., example="student_123")
@@ -10,6 +10,12 @@ class QuizRequest(BaseModel):
 class QuizResponse(BaseModel):
     quiz: str = Field(..., description="Generated quiz text")
 
+class QuizJobSubmitted(BaseModel):
+    job_id: str = Field(..., description="ID to poll with GET /quiz-jobs/{job_id}")
+    status: str = Field(..., example="queued")
+    status_url: str = Field(..., example="/api/teacher/quiz-jobs/5f0c...")
+    events_url: str = Field(..., example="/api/teacher/quiz-jobs/5f0c.../events")
+
 class UploadMaterialResponse(BaseModel):
     status: str = Field(..., example="success")
     file_name: str = Field(..., example="lecture.pdf")
@@ -0,0 +1,269 @@
+import io
+import os
+import csv
+import json
+import asyncio
+import logging
+from datetime import datetime
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from config import grades_collection, attendance_collection
+from models.schemas_monitoring import GradeEntry, AttendanceEntry
+from .student_rollups import add_grade_increments, add_attendance_increments, apply_rollup_increments
+
+logger = logging.getLogger(__name__)
+
+# Rows written per bulk_write call
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "500"))
+# Row errors returned in the response (the total is always reported)
+BULK_MAX_ERRORS = int(os.getenv("BULK_MAX_ERRORS", "500"))
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+# Fields of the rows a batch replaces that the rollup increments need
+PREVIOUS_ROW_PROJECTION = {
+    "_id": 0, "student_id": 1, "quiz_id": 1, "date": 1, "grade": 1, "score": 1, "status": 1, "subject": 1
+}
+
+class BulkImportError(ValueError):
+    """
+    Raised when the uploaded file cannot be imported at all
+    (unknown format, missing header, undecodable text).
+    """
+
+def detect_format(filename: str = None, content_type: str = None, requested: str = None) -> str:
+    """
+    Pick the import format from the explicit ?format=, the file extension or the content type.
+    """
+    if requested:
+        requested = requested.lower()
+        if requested not in SUPPORTED_FORMATS:
+            raise BulkImportError(f"Unsupported format '{requested}'. Use csv or ndjson.")
+        return requested
+
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension == ".csv" or (content_type or "").startswith("text/csv"):
+        return "csv"
+    if extension in (".ndjson", ".jsonl") or "ndjson" in (content_type or ""):
+        return "ndjson"
+    raise BulkImportError("Cannot tell the file format. Upload a .csv or .ndjson file or pass ?format=")
+
+def _iter_csv_rows(text):
+    """
+    Yield (line_number, row dict or error message) for a CSV file with a header row.
+    """
+    reader = csv.DictReader(text)
+    if not reader.fieldnames:
+        raise BulkImportError("The CSV file has no header row")
+    reader.fieldnames = [name.strip() for name in reader.fieldnames]
+
+    for row in reader:
+        if None in row:
+            yield reader.line_num, "Row has more columns than the header"
+            continue
+        # Empty cells mean "not given"
+        yield reader.line_num, {key: (value.strip() or None) if isinstance(value, str) else value for key, value in row.items()}
+
+def _iter_ndjson_rows(text):
+    """
+    Yield (line_number, row dict or error message) for a newline delimited JSON file.
+    """
+    for line_number, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, f"Invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_number, "Each line must be a JSON object"
+            continue
+        yield line_number, row
+
+def _take(rows, count: int) -> list:
+    """
+    Pull up to count rows from the parser (runs in a worker thread).
+    """
+    batch = []
+    for item in rows:
+        batch.append(item)
+        if len(batch) >= count:
+            break
+    return batch
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" for e in error.errors())
+
+def _grade_key(entry: GradeEntry) -> dict:
+    return {"student_id": entry.student_id, "quiz_id": entry.quiz_id}
+
+def _grade_operation(entry: GradeEntry, teacher_id: str) -> UpdateOne:
+    """
+    Upsert on (student_id, quiz_id), the same key record_grade uses,
+    so re-importing a gradebook updates instead of duplicating.
+    """
+    grade_data = {
+        "student_id": entry.student_id,
+        "quiz_id": entry.quiz_id,
+        "grade": entry.score,
+        "added_by": teacher_id,
+        "timestamp": entry.submitted_at or datetime.utcnow()
+    }
+    for field in ("subject", "section", "feedback"):
+        value = getattr(entry, field)
+        if value is not None:
+            grade_data[field] = value
+    return UpdateOne(_grade_key(entry), {"$set": grade_data}, upsert=True)
+
+def _grade_increments(increments: dict, entry: GradeEntry, previous: dict = None) -> dict:
+    """
+    Add the rollup changes of one imported grade. Returns the row as it now is.
+    """
+    # Omitted optional fields keep their stored value
+    subject = entry.subject if entry.subject is not None else (previous or {}).get("subject")
+    add_grade_increments(increments, entry.student_id, subject, entry.score, previous)
+    return {"grade": entry.score, "subject": subject}
+
+def _attendance_key(entry: AttendanceEntry) -> dict:
+    return {"student_id": entry.student_id, "date": entry.date.strftime("%Y-%m-%d")}
+
+def _attendance_operation(entry: AttendanceEntry, teacher_id: str) -> UpdateOne:
+    """
+    Upsert on (student_id, date), the same key mark_attendance uses.
+    """
+    key = _attendance_key(entry)
+    attendance_data = {
+        **key,
+        "status": entry.status,
+        "marked_by": teacher_id,
+        "marked_at": datetime.utcnow()
+    }
+    for field in ("subject", "section"):
+        value = getattr(entry, field)
+        if value is not None:
+            attendance_data[field] = value
+    return UpdateOne(key, {"$set": attendance_data}, upsert=True)
+
+def _attendance_increments(increments: dict, entry: AttendanceEntry, previous: dict = None) -> dict:
+    """
+    Add the rollup changes of one imported attendance mark. Returns the row as it now is.
+    """
+    subject = entry.subject if entry.subject is not None else (previous or {}).get("subject")
+    add_attendance_increments(increments, entry.student_id, subject, entry.status, previous)
+    return {"status": entry.status, "subject": subject}
+
+async def _find_previous_rows(collection, keys: list) -> dict:
+    """
+    The stored rows with these keys, keyed by their key values.
+    """
+    previous = {}
+    async for row in collection.find({"$or": keys}, PREVIOUS_ROW_PROJECTION):
+        previous[tuple(row.get(field) for field in keys[0])] = row
+    return previous
+
+async def _import_rows(upload, file_format: str, model, row_key, build_operation, add_increments, collection, teacher_id: str) -> dict:
+    """
+    Stream-parse an uploaded file, validate each row against the model and
+    write valid rows with unordered bulk_write calls of BULK_BATCH_SIZE.
+    Parsing of the next batch overlaps with writing the previous one.
+    Each batch's rollup increments are computed from the rows it replaces,
+    read just before the write (a concurrent change to one of those rows in
+    between is only repaired by the rollup --rebuild command).
+    """
+    report = {"rows": 0, "inserted": 0, "updated": 0, "failed": 0, "errors": []}
+
+    def add_error(line: int, message: str):
+        report["failed"] += 1
+        if len(report["errors"]) < BULK_MAX_ERRORS:
+            report["errors"].append({"line": line, "error": message})
+
+    async def write_batch(entries: list, operations: list, lines: list):
+        keys = [row_key(entry) for entry in entries]
+        current = await _find_previous_rows(collection, keys)
+        failed = set()
+        try:
+            result = await collection.bulk_write(operations, ordered=False)
+            details = result.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+            for write_error in details.get("writeErrors", []):
+                failed.add(write_error["index"])
+                add_error(lines[write_error["index"]], write_error.get("errmsg", "Write failed"))
+        report["inserted"] += details.get("nUpserted", 0)
+        report["updated"] += details.get("nMatched", 0)
+
+        # Rows repeated within the batch see the earlier row as their previous one
+        increments = {}
+        for index, entry in enumerate(entries):
+            if index not in failed:
+                key = tuple(keys[index].values())
+                current[key] = add_increments(increments, entry, current.get(key))
+        try:
+            await apply_rollup_increments(increments)
+        except Exception as e:
+            # The rows are already stored; --rebuild repairs the rollups
+            logger.warning("Rollup update failed: %s", e, extra={"rows": len(entries)})
+
+    upload.file.seek(0)
+    text = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    try:
+        rows = _iter_csv_rows(text) if file_format == "csv" else _iter_ndjson_rows(text)
+        pending_write = None
+        while True:
+            try:
+                batch = await asyncio.to_thread(_take, rows, BULK_BATCH_SIZE)
+            except UnicodeDecodeError:
+                if report["rows"] == 0:
+                    raise BulkImportError("The file must be UTF-8 encoded text")
+                # Keep what was already imported and report where it stopped
+                add_error(None, "Import stopped: the rest of the file is not valid UTF-8")
+                break
+            if not batch:
+                break
+
+            entries, operations, lines = [], [], []
+            for line, row in batch:
+                report["rows"] += 1
+                if isinstance(row, str):
+                    add_error(line, row)
+                    continue
+                try:
+                    entry = model(**row)
+                except ValidationError as e:
+                    add_error(line, _validation_message(e))
+                    continue
+                entries.append(entry)
+                operations.append(build_operation(entry, teacher_id))
+                lines.append(line)
+
+            if pending_write:
+                await pending_write
+                pending_write = None
+            if operations:
+                pending_write = asyncio.create_task(write_batch(entries, operations, lines))
+
+        if pending_write:
+            await pending_write
+    finally:
+        # Leave the upload's file open for Starlette to close
+        text.detach()
+
+    report["errors_truncated"] = report["failed"] > len(report["errors"])
+    return report
+
+async def import_grades(upload, teacher_id: str, file_format: str) -> dict:
+    """
+    Import a CSV/NDJSON gradebook (GradeEntry fields per row).
+    Returns {"rows", "inserted", "updated", "failed", "errors", "errors_truncated"}.
+    """
+    return await _import_rows(upload, file_format, GradeEntry, _grade_key, _grade_operation, _grade_increments, grades_collection, teacher_id)
+
+async def import_attendance(upload, teacher_id: str, file_format: str) -> dict:
+    """
+    Import a CSV/NDJSON roll call (AttendanceEntry fields per row).
+    Returns {"rows", "inserted", "updated", "failed", "errors", "errors_truncated"}.
+    """
+    return await _import_rows(upload, file_format, AttendanceEntry, _attendance_key, _attendance_operation, _attendance_increments, attendance_collection, teacher_id)
@@ -0,0 +1,95 @@
+import os
+import numpy as np
+from config import grades_collection
+from .monitoring_tools import GRADE_VALUE
+
+# Students below this average, or this many standard deviations under the
+# class mean, are flagged as at risk
+AT_RISK_SCORE = float(os.getenv("AT_RISK_SCORE", "60"))
+AT_RISK_Z_SCORE = float(os.getenv("AT_RISK_Z_SCORE", "-1.0"))
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+async def load_scores(section: str = None, subject: str = None) -> tuple:
+    """
+    Load every matching grade as two parallel arrays in one projected query:
+    (student_ids as an object array, scores as float64).
+    """
+    query = {}
+    if section:
+        query["section"] = section
+    if subject:
+        query["subject"] = subject
+
+    pipeline = [
+        {"$match": query},
+        {"$project": {"_id": 0, "student_id": 1, "value": GRADE_VALUE}},
+        {"$match": {"value": {"$type": "number"}}}
+    ]
+    rows = await grades_collection.aggregate(pipeline).to_list(length=None)
+
+    student_ids = np.array([row["student_id"] for row in rows], dtype=object)
+    scores = np.fromiter((row["value"] for row in rows), dtype=np.float64, count=len(rows))
+    return student_ids, scores
+
+def _round(values, digits: int = 2) -> list:
+    return np.round(values, digits).tolist()
+
+def compute_grade_distribution(student_ids: np.ndarray, scores: np.ndarray, bucket_width: int = 10) -> dict:
+    """
+    Class statistics over raw grade rows plus per-student averages,
+    z-scores and the at-risk list, all computed with array operations.
+    """
+    if scores.size == 0:
+        return {"grade_count": 0, "student_count": 0, "students": [], "at_risk": []}
+
+    # Grade-level distribution
+    edges = np.append(np.arange(0, 100, bucket_width, dtype=np.float64), 100)
+    counts, _ = np.histogram(np.clip(scores, 0, 100), bins=edges)
+    percentiles = np.percentile(scores, PERCENTILES)
+
+    # Per-student averages: group rows by student without a Python loop
+    students, inverse = np.unique(student_ids.astype(str), return_inverse=True)
+    grade_counts = np.bincount(inverse)
+    averages = np.bincount(inverse, weights=scores) / grade_counts
+
+    class_mean = averages.mean()
+    class_std = averages.std()
+    z_scores = (averages - class_mean) / class_std if class_std > 0 else np.zeros_like(averages)
+
+    at_risk_mask = (averages < AT_RISK_SCORE) | (z_scores <= AT_RISK_Z_SCORE)
+    order = np.argsort(averages, kind="stable")
+
+    student_rows = [
+        {"student_id": student_id, "average": average, "grade_count": count, "z_score": z_score}
+        for student_id, average, count, z_score in zip(
+            students[order].tolist(), _round(averages[order]), grade_counts[order].tolist(), _round(z_scores[order], 3)
+        )
+    ]
+
+    return {
+        "grade_count": int(scores.size),
+        "student_count": int(students.size),
+        "mean": round(float(scores.mean()), 2),
+        "median": round(float(np.median(scores)), 2),
+        "std": round(float(scores.std()), 2),
+        "min": round(float(scores.min()), 2),
+        "max": round(float(scores.max()), 2),
+        "percentiles": {f"p{p}": value for p, value in zip(PERCENTILES, _round(percentiles))},
+        "histogram": [
+            {"from": float(low), "to": float(high), "count": int(count)}
+            for low, high, count in zip(edges[:-1], edges[1:], counts)
+        ],
+        "student_mean": round(float(class_mean), 2),
+        "student_std": round(float(class_std), 2),
+        "students": student_rows,
+        "at_risk": [row for row, flagged in zip(student_rows, at_risk_mask[order].tolist()) if flagged]
+    }
+
+async def get_grade_distribution(section: str = None, subject: str = None, bucket_width: int = 10) -> dict:
+    """
+    Grade statistics for a section and/or subject.
+    """
+    student_ids, scores = await load_scores(section, subject)
+    distribution = compute_grade_distribution(student_ids, scores, bucket_width)
+    return {"section": section, "subject": subject, **distribution}
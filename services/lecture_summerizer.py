@@ -1,55 +1,142 @@
-from utils.llm_templates import generate_summary_prompt
-from utils.llm_client import call_llm, generate_summary_with_llm
+import logging
+from utils.llm_templates import generate_summary_prompt, generate_section_summary_prompt, generate_combined_summary_prompt
+from utils.llm_client import call_llm, stream_llm, is_llm_error, generate_summary_with_llm
+from utils.text_chunker import estimate_tokens, split_text_into_chunks
+from utils.pagination import paginate, DEFAULT_PAGE_SIZE
 from config import summaries_collection
 from datetime import datetime
+import asyncio
+import os
 import uuid
 from .pdf_extractor import extract_text_from_pdf
 
-def summarize_lecture(subject: str, lecture_number: int, content: str) -> str:
+logger = logging.getLogger(__name__)
+
+# Lectures longer than this (estimated tokens) are summarized section by section
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", "6000"))
+# Number of section summaries generated concurrently for a single lecture
+SUMMARY_MAP_CONCURRENCY = int(os.getenv("SUMMARY_MAP_CONCURRENCY", "4"))
+
+# Summary list entries leave out the summary body, fetch it by ID instead
+SUMMARY_LIST_PROJECTION = {"summary_id": 1, "subject": 1, "lecture_number": 1, "created_at": 1}
+
+async def summarize_sections(subject: str, lecture_number: int, sections: list) -> list:
+    """
+    Summarize each section concurrently (map step), at most
+    SUMMARY_MAP_CONCURRENCY at a time, keeping the original order.
+    """
+    semaphore = asyncio.Semaphore(SUMMARY_MAP_CONCURRENCY)
+
+    async def summarize_section(index: int, section_text: str) -> str:
+        prompt = generate_section_summary_prompt(subject, lecture_number, section_text, index + 1, len(sections))
+        async with semaphore:
+            summary = await call_llm(prompt)
+        if is_llm_error(summary):
+            raise Exception(f"Section {index + 1} of {len(sections)}: {summary}")
+        return summary
+
+    return await asyncio.gather(*(summarize_section(i, text) for i, text in enumerate(sections)))
+
+async def build_summary_prompt(subject: str, lecture_number: int, content: str) -> str:
+    """
+    Build the final summarization prompt for a lecture.
+    Short lectures go to Gemini as-is; long ones are split into token-bounded
+    sections, summarized in parallel, and the section summaries are merged by
+    the returned (reduce) prompt.
+    """
+    if estimate_tokens(content) <= SUMMARY_CHUNK_TOKENS:
+        return generate_summary_prompt(subject, lecture_number, content)
+
+    sections = split_text_into_chunks(content, SUMMARY_CHUNK_TOKENS)
+    logger.info("Lecture split for map-reduce summarization", extra={"sections": len(sections)})
+    summaries = await summarize_sections(subject, lecture_number, sections)
+
+    # Very long lectures may need more than one reduce round
+    while estimate_tokens("\n\n".join(summaries)) > SUMMARY_CHUNK_TOKENS and len(summaries) > 1:
+        merged = split_text_into_chunks("\n".join(summaries), SUMMARY_CHUNK_TOKENS)
+        if len(merged) >= len(summaries):
+            break
+        summaries = await summarize_sections(subject, lecture_number, merged)
+
+    return generate_combined_summary_prompt(subject, lecture_number, summaries)
+
+async def summarize_lecture(subject: str, lecture_number: int, content: str) -> str:
     """
     Generate a summary of the lecture content using Gemini.
     """
-    prompt = generate_summary_prompt(subject, lecture_number, content)
-    summary = call_llm(prompt)
+    prompt = await build_summary_prompt(subject, lecture_number, content)
+    summary = await call_llm(prompt)
     return summary
 
-def summarize_lecture_and_store(student_id: str, subject: str, lecture_number: int, lecture_text: str = None, file_data: bytes = None) -> str:
+async def prepare_lecture_content(lecture_text: str = None, file_data: bytes = None) -> str:
+    """
+    Return the text to summarize, extracted from the PDF file if one was provided.
+    """
+    # If file provided, extract text from PDF
+    if file_data:
+        logger.debug("Processing uploaded file", extra={"size": len(file_data)})
+        # PDF parsing is CPU-bound, keep it off the event loop
+        content = await asyncio.to_thread(extract_text_from_pdf, file_data)
+        if not content:
+            raise Exception("Could not extract text from PDF file")
+        logger.debug("Extracted text from PDF", extra={"characters": len(content)})
+        return content
+
+    # If text provided, use it directly
+    if lecture_text:
+        logger.debug("Using provided text", extra={"characters": len(lecture_text)})
+        return lecture_text
+
+    raise Exception("No lecture text or file provided for summarization")
+
+async def summarize_lecture_and_store(student_id: str, subject: str, lecture_number: int, lecture_text: str = None, file_data: bytes = None) -> str:
     """
     Summarize lecture from text or PDF file and store in MongoDB.
     """
     try:
-        content_to_summarize = ""
-        
-        # If file provided, extract text from PDF
-        if file_data:
-            print(f"📄 Processing uploaded file, size: {len(file_data)} bytes")
-            content_to_summarize = extract_text_from_pdf(file_data)
-            if not content_to_summarize:
-                raise Exception("Could not extract text from PDF file")
-            print(f"📝 Extracted {len(content_to_summarize)} characters from PDF")
-        
-        # If text provided, use it directly
-        elif lecture_text:
-            content_to_summarize = lecture_text
-            print(f"📝 Using provided text, length: {len(content_to_summarize)} characters")
-        
-        else:
-            raise Exception("No lecture text or file provided for summarization")
+        content_to_summarize = await prepare_lecture_content(lecture_text, file_data)
 
         # Generate summary using Gemini
-        print(f"🤖 Generating summary for {subject}, Lecture {lecture_number}...")
-        summary = summarize_lecture(subject, lecture_number, content_to_summarize)
+        logger.info("Generating summary", extra={"subject": subject, "lecture_number": lecture_number})
+        summary = await summarize_lecture(subject, lecture_number, content_to_summarize)
 
         # Save to MongoDB
-        save_summary_to_mongodb(student_id, subject, lecture_number, summary)
+        await save_summary_to_mongodb(student_id, subject, lecture_number, summary)
 
         return summary
 
     except Exception as e:
-        print(f"❌ Summarization failed: {str(e)}")
+        logger.exception("Summarization failed")
         raise Exception(f"Summarization failed: {str(e)}")
 
-def save_summary_to_mongodb(student_id: str, subject: str, lecture_number: int, summary: str) -> str:
+async def stream_lecture_summary(student_id: str, subject: str, lecture_number: int, lecture_text: str = None, file_data: bytes = None):
+    """
+    Summarize a lecture while streaming the summary as it is generated.
+    Yields event dicts: "start", then one "chunk" per text fragment, then "done"
+    once the assembled summary has been stored (or "error" if anything failed).
+    """
+    yield {"event": "start", "subject": subject, "lecture_number": lecture_number}
+
+    try:
+        content_to_summarize = await prepare_lecture_content(lecture_text, file_data)
+
+        logger.info("Streaming summary", extra={"subject": subject, "lecture_number": lecture_number})
+        prompt = await build_summary_prompt(subject, lecture_number, content_to_summarize)
+        parts = []
+        async for text in stream_llm(prompt):
+            parts.append(text)
+            yield {"event": "chunk", "text": text}
+
+        summary = "".join(parts).strip()
+        summary_id = await save_summary_to_mongodb(student_id, subject, lecture_number, summary)
+
+        yield {"event": "done", "summary_id": summary_id, "length": len(summary)}
+
+    except Exception as e:
+        logger.exception("Streaming summarization failed")
+        yield {"event": "error", "detail": f"Summarization failed: {str(e)}"}
+
+async def save_summary_to_mongodb(student_id: str, subject: str, lecture_number: int, summary: str) -> str:
     """
     Save the summarized lecture to MongoDB.
     """
@@ -63,19 +150,26 @@ def save_summary_to_mongodb(student_id: str, subject: str, lecture_number: int,
         "created_at": datetime.utcnow()
     }
     
-    result = summaries_collection.insert_one(summary_data)
-    print(f"💾 Summary saved to database with ID: {summary_id}")
+    result = await summaries_collection.insert_one(summary_data)
+    logger.info("Summary saved", extra={"summary_id": summary_id})
     return summary_id
 
-def get_summary_by_id(summary_id: str) -> dict:
+async def get_summary_by_id(summary_id: str) -> dict:
     """
     Retrieve a summary document from MongoDB.
     """
     from bson import ObjectId
     try:
-        summary = summaries_collection.find_one({"_id": ObjectId(summary_id)})
+        summary = await summaries_collection.find_one({"_id": ObjectId(summary_id)})
         return summary if summary else {}
     except:
         # Also try searching by summary_id field for backward compatibility
-        summary = summaries_collection.find_one({"summary_id": summary_id})
-        return summary if summary else {}
\ No newline at end of file
+        summary = await summaries_collection.find_one({"summary_id": summary_id})
+        return summary if summary else {}
+
+async def get_summaries_by_student(student_id: str, limit: int = DEFAULT_PAGE_SIZE, after: str = None) -> dict:
+    """
+    Get one page of a student's summaries (without the summary body), newest first.
+    Returns {"items": [...], "next_after": token or None}.
+    """
+    return await paginate(summaries_collection, {"student_id": student_id}, SUMMARY_LIST_PROJECTION, limit, after)
\ No newline at end of file
@@ -1,27 +1,223 @@
+import logging
+import io
+import os
 import uuid
+import asyncio
+import hashlib
+import inspect
 from datetime import datetime
-from config import materials_collection, db
-import gridfs
+from config import materials_collection, material_texts_collection, fs_bucket, fs_files_collection, fs_chunks_collection, MAX_UPLOAD_BYTES
 from bson import ObjectId
+from pymongo import ReturnDocument
+from gridfs.errors import FileExists
+from utils.pagination import paginate, DEFAULT_PAGE_SIZE
+from .pdf_extractor import extract_pages_from_pdf, get_pdf_info
 
-# Initialize GridFS
-fs = gridfs.GridFS(db)
+logger = logging.getLogger(__name__)
 
 ALLOWED_EXTENSIONS = {"pdf", "docx", "pptx", "txt"}
 
+# Bytes copied from the upload stream into GridFS per write
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# Metadata fields returned by the material list endpoints
+MATERIAL_LIST_PROJECTION = {
+    "material_id": 1, "filename": 1, "subject": 1, "section": 1, "teacher_id": 1,
+    "file_size": 1, "uploaded_at": 1, "text_status": 1, "page_count": 1
+}
+
+class MaterialTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+class MaterialStorageBusyError(RuntimeError):
+    """Raised when the stored copy of uploaded content is being deleted; retrying shortly succeeds."""
+
+# Writes of a seekable upload tried while its stored copy is being deleted
+UPLOAD_STORE_ATTEMPTS = 3
+UPLOAD_RETRY_DELAY_SECONDS = 0.05
+
+# Number of materials whose text is extracted at the same time in the background
+MATERIAL_INGEST_CONCURRENCY = int(os.getenv("MATERIAL_INGEST_CONCURRENCY", "2"))
+_ingest_semaphore = asyncio.Semaphore(MATERIAL_INGEST_CONCURRENCY)
+# Strong references so running ingestion tasks are not garbage collected
+_ingest_tasks = set()
+
 def is_allowed_file(filename: str) -> bool:
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def upload_material(file_data: bytes, filename: str, teacher_id: str, section: str, subject: str = None) -> str:
+async def _maybe_await(value):
+    """
+    Support both sync file objects (BytesIO) and async ones (UploadFile).
+    """
+    if inspect.isawaitable(value):
+        return await value
+    return value
+
+def _too_large_error() -> MaterialTooLargeError:
+    return MaterialTooLargeError(f"File too large. Maximum size is {MAX_UPLOAD_BYTES // (1024 * 1024)}MB.")
+
+def _is_seekable(stream) -> bool:
+    # UploadFile has no seekable(), but its spooled file always is
+    seekable = getattr(stream, "seekable", None)
+    return seekable() if callable(seekable) else hasattr(stream, "seek")
+
+async def _hash_stream(stream) -> tuple:
+    """
+    Read a seekable stream once to get (sha256 hex digest, size), enforcing
+    MAX_UPLOAD_BYTES, then rewind it.
+    """
+    sha256 = hashlib.sha256()
+    file_size = 0
+    while True:
+        chunk = await _maybe_await(stream.read(UPLOAD_CHUNK_SIZE))
+        if not chunk:
+            break
+        file_size += len(chunk)
+        if file_size > MAX_UPLOAD_BYTES:
+            raise _too_large_error()
+        sha256.update(chunk)
+    await _maybe_await(stream.seek(0))
+    return sha256.hexdigest(), file_size
+
+async def _acquire_existing_file(content_hash: str):
+    """
+    Take a reference on the stored GridFS file with this content hash.
+    Returns its file ID, or None if the content is new. A file whose last
+    reference was just released is being deleted and is never reused.
+    """
+    existing = await fs_files_collection.find_one_and_update(
+        {"metadata.sha256": content_hash, "metadata.ref_count": {"$gt": 0}},
+        {"$inc": {"metadata.ref_count": 1}},
+        projection={"_id": 1}
+    )
+    return existing["_id"] if existing else None
+
+async def _write_new_file(stream, filename: str, content_hash: str = None) -> tuple:
+    """
+    Copy a stream into a new GridFS file chunk by chunk, hashing and enforcing
+    MAX_UPLOAD_BYTES as the bytes arrive.
+    Returns (file_id, sha256 hex digest, size); file_id is None when the
+    unique content hash index refused the file because the same bytes are
+    already stored.
+    """
+    grid_in = fs_bucket.open_upload_stream(
+        filename,
+        metadata={"sha256": content_hash, "ref_count": 1}
+    )
+    sha256 = hashlib.sha256()
+    file_size = 0
+    try:
+        while True:
+            chunk = await _maybe_await(stream.read(UPLOAD_CHUNK_SIZE))
+            if not chunk:
+                break
+            file_size += len(chunk)
+            if file_size > MAX_UPLOAD_BYTES:
+                raise _too_large_error()
+            sha256.update(chunk)
+            await grid_in.write(chunk)
+        if content_hash is None:
+            # Unseekable stream: the hash is only known now
+            await grid_in.set("metadata", {"sha256": sha256.hexdigest(), "ref_count": 1})
+        await grid_in.close()
+    except FileExists:
+        # The driver reports the metadata.sha256 DuplicateKeyError as FileExists
+        await grid_in.abort()
+        return None, sha256.hexdigest(), file_size
+    except Exception:
+        # Drop any chunks already written
+        await grid_in.abort()
+        raise
+    return grid_in._id, sha256.hexdigest(), file_size
+
+async def store_file_content(file_data, filename: str) -> tuple:
+    """
+    Store upload content in GridFS, deduplicated by SHA-256.
+    When the same bytes are already stored, a reference is taken on the
+    existing file instead of writing a new copy.
+    Returns (file_id, content_hash, file_size, deduplicated).
+    """
+    stream = io.BytesIO(file_data) if isinstance(file_data, (bytes, bytearray)) else file_data
+
+    if _is_seekable(stream):
+        # Hash the (local, already received) upload first so duplicates never hit GridFS
+        content_hash, file_size = await _hash_stream(stream)
+        for attempt in range(UPLOAD_STORE_ATTEMPTS):
+            file_id = await _acquire_existing_file(content_hash)
+            if file_id is not None:
+                return file_id, content_hash, file_size, True
+            if attempt:
+                # The stored copy refused the last write but is being deleted: wait for it to go
+                await asyncio.sleep(UPLOAD_RETRY_DELAY_SECONDS * attempt)
+                await _maybe_await(stream.seek(0))
+
+            file_id, _, _ = await _write_new_file(stream, filename, content_hash)
+            if file_id is not None:
+                return file_id, content_hash, file_size, False
+            # Refused by the unique hash index: a concurrent upload stored the
+            # same content first (acquired on the next attempt) or it is being deleted
+        raise MaterialStorageBusyError("The stored copy of this file is being deleted, please retry the upload")
+
+    file_id, content_hash, file_size = await _write_new_file(stream, filename)
+    if file_id is not None:
+        return file_id, content_hash, file_size, False
+
+    # Unseekable stream whose content was already stored
+    file_id = await _acquire_existing_file(content_hash)
+    if file_id is None:
+        # Being deleted, and the stream cannot be read again
+        raise MaterialStorageBusyError("The stored copy of this file is being deleted, please retry the upload")
+    return file_id, content_hash, file_size, True
+
+async def release_file_content(file_id, content_hash: str = None):
+    """
+    Drop one reference to a stored GridFS file, deleting it (and its extracted
+    text) once no material uses it any more.
+    """
+    remaining = await fs_files_collection.find_one_and_update(
+        {"_id": file_id},
+        {"$inc": {"metadata.ref_count": -1}},
+        projection={"metadata.ref_count": 1},
+        return_document=ReturnDocument.AFTER
+    )
+    if remaining is None or remaining.get("metadata", {}).get("ref_count", 0) > 0:
+        return
+
+    # Only delete while the file is still unreferenced
+    deleted = await fs_files_collection.delete_one({"_id": file_id, "metadata.ref_count": {"$lte": 0}})
+    if not deleted.deleted_count:
+        return
+    await fs_chunks_collection.delete_many({"files_id": file_id})
+    if content_hash:
+        await material_texts_collection.delete_one({"content_hash": content_hash})
+
+def _start_ingestion(material_id: str):
+    """
+    Run ingest_material_text in the background, bounded by MATERIAL_INGEST_CONCURRENCY.
+    """
+    async def run():
+        async with _ingest_semaphore:
+            await ingest_material_text(material_id)
+
+    task = asyncio.create_task(run())
+    _ingest_tasks.add(task)
+    task.add_done_callback(_ingest_tasks.discard)
+
+async def upload_material(file_data, filename: str, teacher_id: str, section: str, subject: str = None) -> str:
     """
     Upload material to MongoDB GridFS (cloud storage) and save metadata.
+    file_data may be bytes or a file object (e.g. an UploadFile).
+    Identical content is stored only once and shared between materials.
+    Text extraction is started in the background once the upload is stored.
     """
     if not is_allowed_file(filename):
         raise ValueError("Unsupported file format.")
 
     # Store file in GridFS (cloud storage)
-    file_id = fs.put(file_data, filename=filename, content_type="application/octet-stream")
-    
+    file_id, content_hash, file_size, deduplicated = await store_file_content(file_data, filename)
+    if deduplicated:
+        logger.info("Reusing stored copy of %s", filename, extra={"content_hash": content_hash})
+
     # Save metadata to materials collection
     material_id = str(uuid.uuid4())
     material_data = {
@@ -31,42 +227,171 @@ def upload_material(file_data: bytes, filename: str, teacher_id: str, section: s
         "section": section,
         "subject": subject,
         "filename": filename,
-        "file_size": len(file_data),
+        "file_size": file_size,
+        "content_hash": content_hash,
+        "text_status": "pending",
         "uploaded_at": datetime.utcnow()
     }
-    
-    result = materials_collection.insert_one(material_data)
+
+    try:
+        result = await materials_collection.insert_one(material_data)
+    except Exception:
+        await release_file_content(file_id, content_hash)
+        raise
+
+    _start_ingestion(material_id)
     return material_id
 
-def download_material(material_id: str) -> tuple[bytes, str]:
+async def delete_material(material_id: str, teacher_id: str = None) -> bool:
+    """
+    Delete a material's metadata and release its stored file.
+    When teacher_id is given, only that teacher's material is deleted.
+    """
+    query = {"material_id": material_id}
+    if teacher_id:
+        query["teacher_id"] = teacher_id
+
+    material = await materials_collection.find_one_and_delete(query)
+    if not material:
+        return False
+
+    await release_file_content(material["file_id"], material.get("content_hash"))
+    return True
+
+def _extract_material_text(file_data: bytes, filename: str) -> tuple:
+    """
+    Return (text, page_count) for a material file, or (None, None) if the
+    format has no text extractor.
+    """
+    extension = filename.rsplit('.', 1)[-1].lower()
+
+    if extension == "pdf":
+        extraction = extract_pages_from_pdf(file_data)
+        info = get_pdf_info(file_data)
+        page_count = info["page_count"] if info.get("is_valid") else extraction["page_count"]
+        return "\n".join(extraction["pages"]).strip(), page_count
+
+    if extension == "txt":
+        return file_data.decode("utf-8", errors="replace").strip(), None
+
+    return None, None
+
+async def ingest_material_text(material_id: str, file_data: bytes = None):
+    """
+    Extract a material's text once and store it in material_texts keyed by
+    content hash, recording page count, character count and content hash on
+    the material metadata. Content that was already extracted (same hash)
+    is reused without parsing the file again.
+    """
+    try:
+        material = await materials_collection.find_one({"material_id": material_id})
+        if not material:
+            raise ValueError("Material not found")
+
+        content_hash = material.get("content_hash")
+        stored = await material_texts_collection.find_one(
+            {"content_hash": content_hash}, {"page_count": 1, "char_count": 1}
+        ) if content_hash else None
+
+        if stored is None:
+            if file_data is None:
+                grid_out = await fs_bucket.open_download_stream(material["file_id"])
+                file_data = await grid_out.read()
+
+            content_hash = content_hash or hashlib.sha256(file_data).hexdigest()
+            # Extraction is CPU-bound, keep it off the event loop
+            text, page_count = await asyncio.to_thread(_extract_material_text, file_data, material["filename"])
+
+            if text is None:
+                await materials_collection.update_one(
+                    {"material_id": material_id},
+                    {"$set": {"text_status": "unsupported", "content_hash": content_hash}}
+                )
+                return
+
+            stored = {"page_count": page_count, "char_count": len(text)}
+            await material_texts_collection.update_one(
+                {"content_hash": content_hash},
+                {"$set": {
+                    "content_hash": content_hash,
+                    "text": text,
+                    "page_count": page_count,
+                    "char_count": len(text),
+                    "created_at": datetime.utcnow()
+                }},
+                upsert=True
+            )
+
+        await materials_collection.update_one(
+            {"material_id": material_id},
+            {"$set": {
+                "text_status": "ready",
+                "page_count": stored.get("page_count"),
+                "char_count": stored.get("char_count"),
+                "content_hash": content_hash,
+                "text_extracted_at": datetime.utcnow()
+            }}
+        )
+        logger.info("Material ingested", extra={"material_id": material_id, "characters": stored.get("char_count")})
+
+    except Exception as e:
+        logger.exception("Material ingestion failed", extra={"material_id": material_id})
+        await materials_collection.update_one(
+            {"material_id": material_id},
+            {"$set": {"text_status": "failed", "text_error": str(e)}}
+        )
+
+async def get_material_text(material_id: str) -> str:
     """
-    Download material from MongoDB GridFS.
-    Returns (file_data, filename)
+    Return the stored text of a material, ingesting it now if it has not
+    been extracted yet (e.g. materials uploaded before ingestion existed).
     """
-    material = materials_collection.find_one({"material_id": material_id})
+    async def find_text():
+        material = await materials_collection.find_one({"material_id": material_id}, {"content_hash": 1})
+        if not material or not material.get("content_hash"):
+            return None
+        stored = await material_texts_collection.find_one({"content_hash": material["content_hash"]}, {"text": 1})
+        return stored["text"] if stored else None
+
+    text = await find_text()
+    if text is None:
+        await ingest_material_text(material_id)
+        text = await find_text()
+    return text
+
+async def open_material_file(material_id: str) -> tuple:
+    """
+    Open a material's GridFS file for streaming without reading it into memory.
+    Returns (grid_out, filename)
+    """
+    material = await materials_collection.find_one({"material_id": material_id}, {"file_id": 1, "filename": 1})
     if not material:
         raise ValueError("Material not found")
-    
-    file_id = material["file_id"]
-    file_data = fs.get(file_id).read()
-    filename = material["filename"]
-    
-    return file_data, filename
 
-def get_materials_by_section(section: str) -> list:
+    grid_out = await fs_bucket.open_download_stream(material["file_id"])
+    return grid_out, material["filename"]
+
+async def get_materials_by_section(section: str, limit: int = DEFAULT_PAGE_SIZE, after: str = None, projection: dict = None) -> dict:
+    """
+    Get one page of materials for a section (metadata only, not file content).
+    Returns {"items": [...], "next_after": token or None}.
+    """
+    return await paginate(materials_collection, {"section": section}, projection or MATERIAL_LIST_PROJECTION, limit, after)
+
+async def get_materials_by_teacher(teacher_id: str, limit: int = DEFAULT_PAGE_SIZE, after: str = None) -> dict:
     """
-    Get all materials for a section (metadata only, not file content).
+    Get one page of materials uploaded by a teacher (metadata only, not file content).
+    Returns {"items": [...], "next_after": token or None}.
     """
-    materials = materials_collection.find({"section": section})
-    return list(materials)
+    return await paginate(materials_collection, {"teacher_id": teacher_id}, MATERIAL_LIST_PROJECTION, limit, after)
 
-def get_material_info(material_id: str) -> dict:
+async def get_material_info(material_id: str) -> dict:
     """
     Get material metadata without downloading the file.
     """
-    material = materials_collection.find_one({"material_id": material_id})
+    material = await materials_collection.find_one({"material_id": material_id})
     if material:
         # Remove the file_id from response for security
         material.pop('file_id', None)
         return material
-    return None
\ No newline at end of file
+    return None
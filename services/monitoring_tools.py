@@ -1,8 +1,13 @@
 from config import grades_collection, attendance_collection, recommendations_collection
 from datetime import datetime
 from bson import ObjectId
+from pymongo import ReturnDocument
+from .student_rollups import apply_grade, apply_attendance, get_student_rollups
 
-def record_grade(student_id: str, quiz_id: str, grade: float, subject: str = None, feedback: str = None):
+# record_grade() stores "grade" while the teacher grade route stores "score"
+GRADE_VALUE = {"$ifNull": ["$grade", "$score"]}
+
+async def record_grade(student_id: str, quiz_id: str, grade: float, subject: str = None, feedback: str = None):
     """
     Store or update a student's grade for a specific quiz.
     """
@@ -16,27 +21,30 @@ def record_grade(student_id: str, quiz_id: str, grade: float, subject: str = Non
     }
     
     # Use composite key to avoid duplicates
-    grades_collection.update_one(
+    previous = await grades_collection.find_one_and_update(
         {"student_id": student_id, "quiz_id": quiz_id},
         {"$set": grade_data},
-        upsert=True
+        projection={"grade": 1, "score": 1, "subject": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
     )
+    await apply_grade(student_id, subject, grade, previous)
 
-def get_student_grades(student_id: str):
+async def get_student_grades(student_id: str):
     """
     Retrieve all grades for a specific student.
     """
     grades = grades_collection.find({"student_id": student_id})
-    return list(grades)
+    return await grades.to_list(length=None)
 
-def get_grades_by_subject(subject: str):
+async def get_grades_by_subject(subject: str):
     """
     Retrieve all grades for a specific subject.
     """
     grades = grades_collection.find({"subject": subject})
-    return list(grades)
+    return await grades.to_list(length=None)
 
-def get_class_grades(section: str, subject: str = None):
+async def get_class_grades(section: str, subject: str = None):
     """
     Retrieve all grades for a specific class section.
     """
@@ -45,9 +53,9 @@ def get_class_grades(section: str, subject: str = None):
         query["subject"] = subject
     
     grades = grades_collection.find(query)
-    return list(grades)
+    return await grades.to_list(length=None)
 
-def mark_attendance(student_id: str, date: str, status: str = "present", section: str = None, subject: str = None):
+async def mark_attendance(student_id: str, date: str, status: str = "present", section: str = None, subject: str = None):
     """
     Mark student attendance for a specific date.
     """
@@ -61,20 +69,23 @@ def mark_attendance(student_id: str, date: str, status: str = "present", section
     }
     
     # Use composite key to avoid duplicates for same date
-    attendance_collection.update_one(
+    previous = await attendance_collection.find_one_and_update(
         {"student_id": student_id, "date": date},
         {"$set": attendance_data},
-        upsert=True
+        projection={"status": 1, "subject": 1},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
     )
+    await apply_attendance(student_id, subject, status, previous)
 
-def get_attendance_by_student(student_id: str):
+async def get_attendance_by_student(student_id: str):
     """
     Retrieve all attendance records for a student.
     """
     attendance = attendance_collection.find({"student_id": student_id})
-    return list(attendance)
+    return await attendance.to_list(length=None)
 
-def get_attendance_by_date(date: str, section: str = None):
+async def get_attendance_by_date(date: str, section: str = None):
     """
     Retrieve attendance records for a specific date.
     """
@@ -83,9 +94,9 @@ def get_attendance_by_date(date: str, section: str = None):
         query["section"] = section
     
     attendance = attendance_collection.find(query)
-    return list(attendance)
+    return await attendance.to_list(length=None)
 
-def get_attendance_by_section(section: str, start_date: str = None, end_date: str = None):
+async def get_attendance_by_section(section: str, start_date: str = None, end_date: str = None):
     """
     Retrieve attendance records for a specific section.
     """
@@ -99,35 +110,61 @@ def get_attendance_by_section(section: str, start_date: str = None, end_date: st
         query["date"] = {"$lte": end_date}
     
     attendance = attendance_collection.find(query)
-    return list(attendance)
+    return await attendance.to_list(length=None)
+
+async def get_grade_summary(student_id: str, weak_threshold: float = 60):
+    """
+    Average grade overall and per subject, read from the student's rollups.
+    Returns {"average_grade", "grade_count", "subjects": [{"subject", "average", "count"}],
+    "weak_subjects"} or None when the student has no grades.
+    """
+    rollups = await get_student_rollups(student_id)
+    subjects = [
+        {
+            "subject": rollup["subject"],
+            "average": rollup["grade_sum"] / rollup["grade_count"],
+            "count": rollup["grade_count"]
+        }
+        for rollup in rollups if rollup.get("grade_count", 0) > 0
+    ]
+    if not subjects:
+        return None
+
+    grade_count = sum(entry["count"] for entry in subjects)
+    grade_total = sum(rollup["grade_sum"] for rollup in rollups if rollup.get("grade_count", 0) > 0)
+    return {
+        "average_grade": grade_total / grade_count,
+        "grade_count": grade_count,
+        "subjects": subjects,
+        "weak_subjects": [entry["subject"] for entry in subjects if entry["average"] < weak_threshold]
+    }
+
+async def get_low_grade_subjects(student_id: str, threshold: float = 60):
+    """
+    Subjects of every grade below the threshold (one entry per grade).
+    """
+    pipeline = [
+        {"$match": {"student_id": student_id}},
+        {"$project": {"subject": 1, "value": GRADE_VALUE}},
+        # Query operators bracket by type, so grades without a value never match
+        {"$match": {"value": {"$lt": threshold}}},
+        {"$group": {"_id": None, "subjects": {"$push": "$subject"}}}
+    ]
+    results = await grades_collection.aggregate(pipeline).to_list(length=1)
+    return results[0]["subjects"] if results else []
 
-def generate_recommendations(student_id: str):
+async def generate_recommendations(student_id: str):
     """
     Generate study recommendations based on grades.
     This can be replaced by more advanced ML-based insights later.
     """
-    grades = get_student_grades(student_id)
+    summary = await get_grade_summary(student_id)
     
-    if not grades:
+    if not summary:
         return ["No data available to generate recommendations."]
     
-    # Calculate average grade
-    avg_grade = sum([g["grade"] for g in grades]) / len(grades)
-    
-    # Identify weak subjects (below 60%)
-    weak_subjects = []
-    subject_grades = {}
-    
-    for grade in grades:
-        subject = grade.get("subject", "Unknown")
-        if subject not in subject_grades:
-            subject_grades[subject] = []
-        subject_grades[subject].append(grade["grade"])
-    
-    for subject, grades_list in subject_grades.items():
-        subject_avg = sum(grades_list) / len(grades_list)
-        if subject_avg < 60:
-            weak_subjects.append(subject)
+    avg_grade = summary["average_grade"]
+    weak_subjects = summary["weak_subjects"]
     
     # Generate recommendations based on performance
     recommendations = []
@@ -171,11 +208,11 @@ def generate_recommendations(student_id: str):
         "generated_at": datetime.utcnow()
     }
     
-    recommendations_collection.insert_one(recommendation_data)
+    await recommendations_collection.insert_one(recommendation_data)
     
     return recommendations
 
-def get_student_recommendations(student_id: str):
+async def get_student_recommendations(student_id: str):
     """
     Get the latest recommendations for a student.
     """
@@ -183,21 +220,62 @@ def get_student_recommendations(student_id: str):
         {"student_id": student_id}
     ).sort("generated_at", -1).limit(1)
     
-    rec_list = list(recommendations)
+    rec_list = await recommendations.to_list(length=1)
     return rec_list[0] if rec_list else None
 
-def get_attendance_stats(student_id: str, start_date: str = None, end_date: str = None):
+def _attendance_date_filter(start_date: str = None, end_date: str = None) -> dict:
     """
-    Calculate attendance statistics for a student.
+    Build the optional date range condition for attendance queries.
     """
-    query = {"student_id": student_id}
-    
     if start_date and end_date:
-        query["date"] = {"$gte": start_date, "$lte": end_date}
-    
-    attendance_records = list(attendance_collection.find(query))
+        return {"date": {"$gte": start_date, "$lte": end_date}}
+    if start_date:
+        return {"date": {"$gte": start_date}}
+    if end_date:
+        return {"date": {"$lte": end_date}}
+    return {}
+
+# Per-group attendance counters, shared by the student and section pipelines
+_ATTENDANCE_COUNTERS = {
+    "total_classes": {"$sum": 1},
+    "present_count": {"$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}},
+    "absent_count": {"$sum": {"$cond": [{"$eq": ["$status", "absent"]}, 1, 0]}}
+}
+
+def _attendance_stats(row: dict) -> dict:
+    """
+    Shape one aggregated attendance group into the stats dict.
+    """
+    total_classes = row["total_classes"]
+    attendance_rate = (row["present_count"] / total_classes) * 100 if total_classes > 0 else 0
+    return {
+        "total_classes": total_classes,
+        "present_count": row["present_count"],
+        "absent_count": row["absent_count"],
+        "attendance_rate": round(attendance_rate, 2)
+    }
+
+async def get_attendance_stats(student_id: str, start_date: str = None, end_date: str = None):
+    """
+    Calculate attendance statistics for a student.
+    Without a date range the totals come straight from the rollups.
+    """
+    if not start_date and not end_date:
+        rollups = await get_student_rollups(student_id)
+        results = [{
+            "total_classes": sum(rollup.get("attendance_count", 0) for rollup in rollups),
+            "present_count": sum(rollup.get("present_count", 0) for rollup in rollups),
+            "absent_count": sum(rollup.get("absent_count", 0) for rollup in rollups)
+        }]
+    else:
+        query = {"student_id": student_id, **_attendance_date_filter(start_date, end_date)}
+        pipeline = [
+            {"$match": query},
+            {"$group": {"_id": None, **_ATTENDANCE_COUNTERS}}
+        ]
+        results = await attendance_collection.aggregate(pipeline).to_list(length=1)
     
-    if not attendance_records:
+    if not results or results[0]["total_classes"] == 0:
         return {
             "total_classes": 0,
             "present_count": 0,
@@ -205,15 +283,18 @@ def get_attendance_stats(student_id: str, start_date: str = None, end_date: str
             "absent_count": 0
         }
     
-    present_count = sum(1 for record in attendance_records if record.get("status") == "present")
-    absent_count = sum(1 for record in attendance_records if record.get("status") == "absent")
-    total_classes = len(attendance_records)
-    
-    attendance_rate = (present_count / total_classes) * 100 if total_classes > 0 else 0
-    
-    return {
-        "total_classes": total_classes,
-        "present_count": present_count,
-        "absent_count": absent_count,
-        "attendance_rate": round(attendance_rate, 2)
-    }
\ No newline at end of file
+    return _attendance_stats(results[0])
+
+async def get_section_attendance_stats(section: str, start_date: str = None, end_date: str = None):
+    """
+    Calculate attendance statistics for every student of a section in one query.
+    Returns a list of stats dicts with a student_id, sorted by student_id.
+    """
+    query = {"section": section, **_attendance_date_filter(start_date, end_date)}
+    pipeline = [
+        {"$match": query},
+        {"$group": {"_id": "$student_id", **_ATTENDANCE_COUNTERS}},
+        {"$sort": {"_id": 1}}
+    ]
+    rows = await attendance_collection.aggregate(pipeline).to_list(length=None)
+    return [{"student_id": row["_id"], **_attendance_stats(row)} for row in rows]
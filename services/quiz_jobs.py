@@ -0,0 +1,346 @@
+import os
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from config import quiz_jobs_collection
+from utils.llm_client import generate_quiz_with_llm, is_llm_error
+from utils.pagination import paginate, DEFAULT_PAGE_SIZE
+from .quizz_generator import generate_quiz_from_materials, save_quiz_to_mongodb
+
+logger = logging.getLogger(__name__)
+
+# Quiz generations running at once (per process); the rest wait in the queue
+QUIZ_JOB_WORKERS = int(os.getenv("QUIZ_JOB_WORKERS", "4"))
+# Jobs allowed to wait for a worker before new submissions are refused
+QUIZ_JOB_MAX_PENDING = int(os.getenv("QUIZ_JOB_MAX_PENDING", "100"))
+# Upper bound on one generation (material fetch, LLM call, save)
+QUIZ_JOB_TIMEOUT_SECONDS = float(os.getenv("QUIZ_JOB_TIMEOUT_SECONDS", "600"))
+# Finished jobs are deleted by a TTL index after this long
+QUIZ_JOB_RETENTION_DAYS = int(os.getenv("QUIZ_JOB_RETENTION_DAYS", "7"))
+# How often a process refreshes heartbeat_at on the unfinished jobs it owns
+QUIZ_JOB_HEARTBEAT_SECONDS = float(os.getenv("QUIZ_JOB_HEARTBEAT_SECONDS", "30"))
+# Unfinished jobs without a heartbeat for this long were lost with their process (see fail_abandoned_jobs)
+QUIZ_JOB_STALE_SECONDS = int(os.getenv("QUIZ_JOB_STALE_SECONDS", "120"))
+# How often waiters re-read a job that another process is running
+QUIZ_JOB_POLL_SECONDS = float(os.getenv("QUIZ_JOB_POLL_SECONDS", "1"))
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATUSES = (SUCCEEDED, FAILED)
+
+# Job listings leave the quiz body and the ownership fields out
+JOB_LIST_PROJECTION = {"quiz": 0, "owner": 0, "heartbeat_at": 0}
+
+# Identifies this process as the owner of the jobs it queued
+INSTANCE_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class QuizQueueFullError(RuntimeError):
+    """Raised when QUIZ_JOB_MAX_PENDING jobs are already waiting."""
+
+_queue = None
+_workers = []
+_heartbeat_task = None
+# job_id -> Event set on the job's next status change (jobs of this process only)
+_job_events = {}
+_stats = {"submitted": 0, "succeeded": 0, "failed": 0, "rejected": 0, "running": 0}
+
+def _ensure_workers():
+    """
+    Start the queue and worker tasks on first use.
+    """
+    global _queue, _heartbeat_task
+    if _queue is None:
+        _queue = asyncio.Queue(maxsize=QUIZ_JOB_MAX_PENDING)
+        for index in range(QUIZ_JOB_WORKERS):
+            _workers.append(asyncio.create_task(_worker(), name=f"quiz-job-worker-{index}"))
+        _heartbeat_task = asyncio.create_task(_heartbeat(), name="quiz-job-heartbeat")
+        logger.info(
+            "Quiz job workers started",
+            extra={"workers": QUIZ_JOB_WORKERS, "max_pending": QUIZ_JOB_MAX_PENDING, "instance": INSTANCE_ID}
+        )
+
+async def _heartbeat():
+    """
+    Keep heartbeat_at fresh on this process's unfinished jobs, so other
+    processes do not take them for abandoned.
+    """
+    while True:
+        await asyncio.sleep(QUIZ_JOB_HEARTBEAT_SECONDS)
+        try:
+            await quiz_jobs_collection.update_many(
+                {"owner": INSTANCE_ID, "status": {"$in": [QUEUED, RUNNING]}},
+                {"$set": {"heartbeat_at": datetime.utcnow()}}
+            )
+        except Exception as e:
+            logger.warning("Quiz job heartbeat failed: %s", e)
+
+async def stop_workers():
+    """
+    Cancel the workers (application shutdown). Running and queued jobs
+    are marked failed so their clients stop waiting.
+    """
+    global _queue, _heartbeat_task
+    if _queue is None:
+        return
+    for task in _workers + [_heartbeat_task]:
+        task.cancel()
+    await asyncio.gather(*_workers, _heartbeat_task, return_exceptions=True)
+    _workers.clear()
+    _heartbeat_task = None
+
+    while not _queue.empty():
+        job = _queue.get_nowait()
+        await _finish_job(job["job_id"], FAILED, error="The server shut down before the job started")
+    _queue = None
+
+def _notify(job_id: str, finished: bool = False):
+    event = _job_events.pop(job_id, None) if finished else _job_events.get(job_id)
+    if event is not None:
+        if not finished:
+            _job_events[job_id] = asyncio.Event()
+        event.set()
+
+def format_job(job: dict) -> dict:
+    """
+    Shape a job document for API responses.
+    """
+    job = dict(job)
+    for field in ("_id", "expires_at", "owner", "heartbeat_at"):
+        job.pop(field, None)
+    return job
+
+async def submit_quiz_job(teacher_id: str, subject: str, level: str, num_questions: int, material_ids: list = None) -> dict:
+    """
+    Store a queued quiz generation job and hand it to the worker pool.
+    Returns the job; raises QuizQueueFullError when the queue is full.
+    """
+    _ensure_workers()
+    if _queue.full():
+        _stats["rejected"] += 1
+        raise QuizQueueFullError("Too many quiz generations are queued, please retry shortly")
+
+    now = datetime.utcnow()
+    job = {
+        "job_id": str(uuid.uuid4()),
+        "teacher_id": teacher_id,
+        "status": QUEUED,
+        "request": {
+            "subject": subject,
+            "level": level,
+            "num_questions": num_questions,
+            "material_ids": material_ids or []
+        },
+        "quiz_id": None,
+        "quiz": None,
+        "error": None,
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "owner": INSTANCE_ID,
+        "heartbeat_at": now
+    }
+    await quiz_jobs_collection.insert_one(job)
+
+    try:
+        _queue.put_nowait(job)
+    except asyncio.QueueFull:
+        # Filled up while the job was being stored
+        await quiz_jobs_collection.delete_one({"job_id": job["job_id"]})
+        _stats["rejected"] += 1
+        raise QuizQueueFullError("Too many quiz generations are queued, please retry shortly")
+
+    _job_events[job["job_id"]] = asyncio.Event()
+    _stats["submitted"] += 1
+    logger.info("Quiz job queued", extra={"job_id": job["job_id"], "user_id": teacher_id, "queued": _queue.qsize()})
+    return format_job(job)
+
+async def run_quiz_pipeline(teacher_id: str, request: dict) -> tuple:
+    """
+    Generate and store one quiz. Returns (quiz_id, quiz text).
+    """
+    if request["material_ids"]:
+        # One quiz, one LLM call, covering every listed material
+        quiz = await generate_quiz_from_materials(
+            material_ids=request["material_ids"],
+            subject=request["subject"],
+            level=request["level"],
+            num_questions=request["num_questions"]
+        )
+    else:
+        # Fallback: generate quiz without specific material
+        quiz = await generate_quiz_with_llm(
+            subject=request["subject"],
+            level=request["level"],
+            material_text=f"General knowledge about {request['subject']} for {request['level']} level",
+            num_questions=request["num_questions"]
+        )
+
+    # Do not store the LLM's error message as a quiz
+    if is_llm_error(quiz):
+        raise Exception(quiz)
+
+    quiz_id = await save_quiz_to_mongodb(
+        teacher_id=teacher_id,
+        section="default",
+        subject=request["subject"],
+        quiz_content=quiz
+    )
+    return quiz_id, quiz
+
+async def _finish_job(job_id: str, status: str, quiz_id: str = None, quiz: str = None, error: str = None):
+    now = datetime.utcnow()
+    await quiz_jobs_collection.update_one(
+        {"job_id": job_id},
+        {"$set": {
+            "status": status,
+            "quiz_id": quiz_id,
+            "quiz": quiz,
+            "error": error,
+            "finished_at": now,
+            "expires_at": now + timedelta(days=QUIZ_JOB_RETENTION_DAYS)
+        }}
+    )
+    _stats[status] += 1
+    _notify(job_id, finished=True)
+
+async def _run_job(job: dict):
+    job_id = job["job_id"]
+    await quiz_jobs_collection.update_one(
+        {"job_id": job_id},
+        {"$set": {"status": RUNNING, "started_at": datetime.utcnow(), "heartbeat_at": datetime.utcnow()}}
+    )
+    _notify(job_id)
+
+    _stats["running"] += 1
+    try:
+        quiz_id, quiz = await asyncio.wait_for(
+            run_quiz_pipeline(job["teacher_id"], job["request"]),
+            timeout=QUIZ_JOB_TIMEOUT_SECONDS
+        )
+    except asyncio.TimeoutError:
+        logger.warning("Quiz job timed out", extra={"job_id": job_id, "timeout_seconds": QUIZ_JOB_TIMEOUT_SECONDS})
+        await _finish_job(job_id, FAILED, error=f"Quiz generation timed out after {QUIZ_JOB_TIMEOUT_SECONDS:g}s")
+    except asyncio.CancelledError:
+        await _finish_job(job_id, FAILED, error="The server shut down while the job was running")
+        raise
+    except Exception as e:
+        logger.warning("Quiz job failed: %s", e, extra={"job_id": job_id})
+        await _finish_job(job_id, FAILED, error=str(e))
+    else:
+        logger.info("Quiz job finished", extra={"job_id": job_id, "quiz_id": quiz_id})
+        await _finish_job(job_id, SUCCEEDED, quiz_id=quiz_id, quiz=quiz)
+    finally:
+        _stats["running"] -= 1
+
+async def _worker():
+    while True:
+        job = await _queue.get()
+        try:
+            await _run_job(job)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Quiz job worker error", extra={"job_id": job["job_id"]})
+        finally:
+            _queue.task_done()
+
+async def get_quiz_job(job_id: str) -> dict:
+    """
+    The job as stored, or None.
+    """
+    job = await quiz_jobs_collection.find_one({"job_id": job_id})
+    return format_job(job) if job else None
+
+async def _wait_for_change(job_id: str, timeout: float):
+    """
+    Sleep until the job changes status (jobs of this process) or for one
+    poll interval (jobs running elsewhere), at most timeout seconds.
+    """
+    event = _job_events.get(job_id)
+    if event is None:
+        await asyncio.sleep(min(QUIZ_JOB_POLL_SECONDS, timeout))
+        return
+    try:
+        await asyncio.wait_for(event.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        pass
+
+async def wait_for_quiz_job(job_id: str, timeout: float) -> dict:
+    """
+    Long-poll: return the job once it has finished, or as it is after
+    timeout seconds. None if there is no such job.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        job = await get_quiz_job(job_id)
+        remaining = deadline - loop.time()
+        if job is None or job["status"] in FINISHED_STATUSES or remaining <= 0:
+            return job
+        await _wait_for_change(job_id, remaining)
+
+async def iter_quiz_job_events(job_id: str, heartbeat_seconds: float = 15):
+    """
+    Yield the job every time its status changes, ending with the finished
+    job, and {"status": "ping"} when nothing changed for heartbeat_seconds.
+    """
+    last_status = None
+    while True:
+        job = await get_quiz_job(job_id)
+        if job is None:
+            return
+        if job["status"] != last_status:
+            last_status = job["status"]
+            yield job
+        else:
+            yield {"job_id": job_id, "status": "ping"}
+        if job["status"] in FINISHED_STATUSES:
+            return
+        await _wait_for_change(job_id, heartbeat_seconds)
+
+async def get_quiz_jobs_by_teacher(teacher_id: str, limit: int = DEFAULT_PAGE_SIZE, after: str = None) -> dict:
+    """
+    A teacher's quiz jobs, newest first, without the quiz bodies.
+    """
+    return await paginate(quiz_jobs_collection, {"teacher_id": teacher_id}, JOB_LIST_PROJECTION, limit, after)
+
+async def fail_abandoned_jobs() -> int:
+    """
+    Mark unfinished jobs whose owner has not refreshed their heartbeat for
+    QUIZ_JOB_STALE_SECONDS as failed: that process stopped without finishing
+    them (called at startup). Jobs of live processes are left alone.
+    """
+    now = datetime.utcnow()
+    stale = now - timedelta(seconds=QUIZ_JOB_STALE_SECONDS)
+    result = await quiz_jobs_collection.update_many(
+        {
+            "status": {"$in": [QUEUED, RUNNING]},
+            "$or": [
+                {"heartbeat_at": {"$lt": stale}},
+                # Jobs stored before heartbeats existed
+                {"heartbeat_at": None, "created_at": {"$lt": stale}}
+            ]
+        },
+        {"$set": {
+            "status": FAILED,
+            "error": "The job was interrupted by a server restart",
+            "finished_at": now,
+            "expires_at": now + timedelta(days=QUIZ_JOB_RETENTION_DAYS)
+        }}
+    )
+    if result.modified_count:
+        logger.warning("Abandoned quiz jobs marked failed", extra={"count": result.modified_count})
+    return result.modified_count
+
+def get_quiz_job_stats() -> dict:
+    """
+    Counters of this process's worker pool, for /metrics.
+    """
+    stats = dict(_stats)
+    stats["queued"] = _queue.qsize() if _queue is not None else 0
+    stats["workers"] = QUIZ_JOB_WORKERS
+    return stats
@@ -1,46 +1,96 @@
-from utils.llm_templates import generate_quiz_prompt
-from utils.llm_client import call_llm, generate_quiz_with_llm
+import logging
+from utils.llm_client import generate_quiz_with_llm
+from utils.text_chunker import estimate_tokens, allocate_token_budget
+from utils.passage_retrieval import select_passages
 from config import quizzes_collection, materials_collection
 from datetime import datetime
+import asyncio
 import uuid
-from .pdf_extractor import extract_text_from_pdf
 import os
 from bson import ObjectId
 
-def generate_quiz_from_text(subject: str, level: str, material_text: str, num_questions: int = 5) -> str:
+logger = logging.getLogger(__name__)
+
+# Token budget for the material text of one quiz prompt, shared between materials
+QUIZ_CONTEXT_TOKENS = int(os.getenv("QUIZ_CONTEXT_TOKENS", "24000"))
+# Smallest share a material gets when the budget has to be split
+QUIZ_MATERIAL_MIN_TOKENS = int(os.getenv("QUIZ_MATERIAL_MIN_TOKENS", "500"))
+# Materials fetched/extracted at once for one quiz
+QUIZ_MATERIAL_CONCURRENCY = int(os.getenv("QUIZ_MATERIAL_CONCURRENCY", "4"))
+QUIZ_MAX_MATERIALS = int(os.getenv("QUIZ_MAX_MATERIALS", "20"))
+
+async def load_material_texts(material_ids: list) -> list:
     """
-    Generate a quiz from lecture/material text using Gemini.
+    Fetch the text of every material concurrently (extracting it first for
+    materials that were never ingested). Duplicate IDs are read once.
+    Returns [(material_id, text)] in request order.
     """
-    prompt = generate_quiz_prompt(subject, level, material_text, num_questions)
-    quiz_text = call_llm(prompt)
-    return quiz_text
+    material_ids = list(dict.fromkeys(material_ids))
+    if len(material_ids) > QUIZ_MAX_MATERIALS:
+        raise ValueError(f"A quiz can use at most {QUIZ_MAX_MATERIALS} materials")
+
+    found = await materials_collection.find(
+        {"material_id": {"$in": material_ids}}, {"material_id": 1, "_id": 0}
+    ).to_list(length=None)
+    missing = set(material_ids) - {material["material_id"] for material in found}
+    if missing:
+        raise ValueError(f"No material found with ID: {', '.join(sorted(missing))}")
+
+    semaphore = asyncio.Semaphore(QUIZ_MATERIAL_CONCURRENCY)
+
+    async def load(material_id: str) -> str:
+        async with semaphore:
+            return await get_material_text(material_id)
 
-def generate_quiz_from_material_id(material_id: str, subject: str, level: str) -> str:
+    texts = await asyncio.gather(*(load(material_id) for material_id in material_ids))
+    for material_id, text in zip(material_ids, texts):
+        if not text:
+            raise ValueError(f"No text could be extracted from material {material_id}")
+    return list(zip(material_ids, texts))
+
+def pack_material_texts(materials: list, query: str, budget_tokens: int = QUIZ_CONTEXT_TOKENS) -> str:
     """
-    Generate a quiz based on a specific material ID.
+    Fit several materials into one prompt: each keeps a share of the token
+    budget proportional to its size (at least QUIZ_MATERIAL_MIN_TOKENS when
+    possible), filled with its passages most relevant to the query.
     """
-    try:
-        # Get material from MongoDB
-        material = materials_collection.find_one({"material_id": material_id})
-        if not material:
-            raise Exception(f"No material found with ID: {material_id}")
+    if len(materials) == 1:
+        return select_passages(materials[0][1], query, budget_tokens)
 
-        # Get file data
-        file_data, filename = download_material(material_id)
-        
-        # Extract text from file
-        material_text = extract_text_from_pdf(file_data)
-        if not material_text:
-            raise Exception("No text could be extracted from the file.")
+    # Leave room for the per-material headings
+    budget_tokens -= len(materials) * 10
+    sizes = [estimate_tokens(text) for _, text in materials]
+    shares = allocate_token_budget(sizes, budget_tokens, QUIZ_MATERIAL_MIN_TOKENS)
 
-        # Generate quiz using Gemini
-        quiz_text = generate_quiz_with_llm(subject, level, material_text)
-        return quiz_text
+    sections = [
+        f"MATERIAL {index} of {len(materials)}:\n{select_passages(text, query, share)}"
+        for index, ((_, text), share) in enumerate(zip(materials, shares), start=1)
+    ]
+    logger.info(
+        "Packed quiz materials",
+        extra={"materials": len(materials), "material_tokens": sum(sizes), "packed_tokens": sum(shares)}
+    )
+    return "\n\n".join(sections)
+
+async def generate_quiz_from_materials(material_ids: list, subject: str, level: str, num_questions: int = 5) -> str:
+    """
+    Generate one quiz covering every listed material with a single LLM call.
+    """
+    try:
+        materials = await load_material_texts(material_ids)
+        material_text = pack_material_texts(materials, f"{subject} {level}")
+        return await generate_quiz_with_llm(subject, level, material_text, num_questions)
 
     except Exception as e:
         raise Exception(f"Quiz generation failed: {str(e)}")
 
-def save_quiz_to_mongodb(teacher_id: str, section: str, subject: str, quiz_content: str) -> str:
+async def generate_quiz_from_material_id(material_id: str, subject: str, level: str, num_questions: int = 5) -> str:
+    """
+    Generate a quiz based on a specific material ID.
+    """
+    return await generate_quiz_from_materials([material_id], subject, level, num_questions)
+
+async def save_quiz_to_mongodb(teacher_id: str, section: str, subject: str, quiz_content: str) -> str:
     """
     Save the generated quiz to MongoDB and return the quiz ID.
     """
@@ -54,29 +104,28 @@ def save_quiz_to_mongodb(teacher_id: str, section: str, subject: str, quiz_conte
         "created_at": datetime.utcnow()
     }
     
-    result = quizzes_collection.insert_one(quiz_data)
+    result = await quizzes_collection.insert_one(quiz_data)
     return quiz_id
 
-def get_quiz_by_id(quiz_id: str) -> dict:
+async def get_quiz_by_id(quiz_id: str) -> dict:
     """
     Fetch a quiz by ID from MongoDB.
     """
     try:
         # Try by MongoDB _id first
-        quiz = quizzes_collection.find_one({"_id": ObjectId(quiz_id)})
+        quiz = await quizzes_collection.find_one({"_id": ObjectId(quiz_id)})
         if quiz:
             return quiz
         
         # Try by quiz_id field
-        quiz = quizzes_collection.find_one({"quiz_id": quiz_id})
+        quiz = await quizzes_collection.find_one({"quiz_id": quiz_id})
         return quiz if quiz else {}
     except:
         return {}
 
-# Helper function to download material (using your material_manager)
-def download_material(material_id: str):
+async def get_material_text(material_id: str):
     """
-    Download material using the material_manager.
+    Get the stored material text using the material_manager.
     """
-    from .material_manger import download_material as dm
-    return dm(material_id)
\ No newline at end of file
+    from .material_manger import get_material_text as gmt
+    return await gmt(material_id)
\ No newline at end of file
@@ -0,0 +1,362 @@
+"""
+Per-student, per-subject performance rollups.
+
+Every grade and attendance write also updates one student_rollups document
+keyed by (student_id, subject) with $inc/$set/$min/$max, so read endpoints
+answer with an indexed lookup instead of re-aggregating raw rows.
+
+Overwriting an existing grade adjusts count and sum exactly and re-reads
+min, max, last and recent grades of the affected subjects from the raw
+grades. The rebuild command recomputes everything from the raw grades and
+attendance collections:
+
+    python -m services.student_rollups --verify    report differences only
+    python -m services.student_rollups --rebuild   rewrite every rollup
+"""
+import logging
+import os
+import sys
+import asyncio
+from datetime import datetime
+from pymongo import ReplaceOne, UpdateOne
+from config import grades_collection, attendance_collection, student_rollups_collection
+
+logger = logging.getLogger(__name__)
+
+# Number of most recent grades kept for the moving average
+ROLLUP_WINDOW = int(os.getenv("ROLLUP_WINDOW", "5"))
+
+# Attendance statuses with their own counter (others only count towards the total)
+TRACKED_STATUSES = ("present", "absent")
+
+# Fields compared by --verify
+ROLLUP_FIELDS = (
+    "grade_count", "grade_sum", "grade_min", "grade_max", "last_grade", "recent_grades",
+    "attendance_count", "present_count", "absent_count"
+)
+
+def rollup_subject(subject) -> str:
+    """
+    Subject key used for rollups (grades and attendance without one share "Unknown").
+    """
+    return subject or "Unknown"
+
+# rollup_subject() for the recompute pipelines: a missing, null or empty subject is "Unknown"
+ROLLUP_SUBJECT_EXPRESSION = {"$cond": [{"$eq": [{"$ifNull": ["$subject", ""]}, ""]}, "Unknown", "$subject"]}
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def add_grade_increments(increments: dict, student_id: str, subject: str, score: float, previous: dict = None):
+    """
+    Add one grade write's count and sum changes to increments
+    ({(student_id, subject): {field: delta}}, see apply_rollup_increments).
+    previous is the grade document this write replaced (if any).
+    """
+    if not _is_number(score):
+        return
+    subject = rollup_subject(subject)
+    previous_score = previous.get("grade", previous.get("score")) if previous else None
+    if _is_number(previous_score):
+        old = increments.setdefault((student_id, rollup_subject(previous.get("subject"))), {})
+        old["grade_count"] = old.get("grade_count", 0) - 1
+        old["grade_sum"] = old.get("grade_sum", 0) - previous_score
+    new = increments.setdefault((student_id, subject), {})
+    new["grade_count"] = new.get("grade_count", 0) + 1
+    new["grade_sum"] = new.get("grade_sum", 0) + score
+
+def add_attendance_increments(increments: dict, student_id: str, subject: str, status: str, previous: dict = None):
+    """
+    Add one attendance write's counter changes to increments.
+    previous is the attendance document this write replaced (if any);
+    status=None removes that mark.
+    """
+    subject = rollup_subject(subject)
+    if previous and rollup_subject(previous.get("subject")) != subject:
+        # The mark moved to another subject: take it out of the old rollup
+        add_attendance_increments(increments, student_id, previous.get("subject"), None, previous)
+        previous = None
+    previous_status = previous.get("status") if previous else None
+
+    counters = increments.setdefault((student_id, subject), {})
+    def add(field: str, delta: int):
+        counters[field] = counters.get(field, 0) + delta
+
+    if not previous:
+        add("attendance_count", 1)
+    elif status is None:
+        add("attendance_count", -1)
+    if previous_status in TRACKED_STATUSES:
+        add(f"{previous_status}_count", -1)
+    if status in TRACKED_STATUSES:
+        add(f"{status}_count", 1)
+
+async def apply_rollup_increments(increments: dict):
+    """
+    Apply increments from add_grade_increments / add_attendance_increments
+    with $inc upserts, then re-read the grade stats (min, max, last, recent)
+    of the keys whose grades changed, since those cannot be adjusted in place,
+    and drop rollups left empty.
+    """
+    if not increments:
+        return
+    now = datetime.utcnow()
+    await student_rollups_collection.bulk_write([
+        UpdateOne({"student_id": student_id, "subject": subject}, {"$inc": fields, "$set": {"updated_at": now}}, upsert=True)
+        for (student_id, subject), fields in increments.items()
+    ], ordered=False)
+    await refresh_grade_stats([key for key, fields in increments.items() if "grade_count" in fields])
+
+    # Rollups whose last grade or mark moved elsewhere have no raw rows left
+    emptied = [key for key, fields in increments.items() if min(fields.values(), default=0) < 0]
+    if emptied:
+        await student_rollups_collection.delete_many({
+            "$or": [{"student_id": student_id, "subject": subject} for student_id, subject in emptied],
+            "grade_count": {"$not": {"$gt": 0}},
+            "attendance_count": {"$not": {"$gt": 0}}
+        })
+
+async def apply_grade(student_id: str, subject: str, score: float, previous: dict = None):
+    """
+    Fold one grade into the student's rollup.
+    previous is the grade document this write replaced (if any), so a
+    re-graded quiz adjusts the totals instead of counting twice.
+    """
+    if not _is_number(score):
+        return
+
+    try:
+        previous_score = previous.get("grade", previous.get("score")) if previous else None
+        if not _is_number(previous_score):
+            # New grade: every field can be updated in place
+            await student_rollups_collection.update_one(
+                {"student_id": student_id, "subject": rollup_subject(subject)},
+                {
+                    "$inc": {"grade_count": 1, "grade_sum": score},
+                    "$min": {"grade_min": score},
+                    "$max": {"grade_max": score},
+                    "$set": {"last_grade": score, "updated_at": datetime.utcnow()},
+                    "$push": {"recent_grades": {"$each": [score], "$slice": -ROLLUP_WINDOW}}
+                },
+                upsert=True
+            )
+            return
+
+        # Re-grade: the replaced score may be the min, the max or one of the recent grades
+        increments = {}
+        add_grade_increments(increments, student_id, subject, score, previous)
+        await apply_rollup_increments(increments)
+    except Exception as e:
+        # The raw grade is already stored; --rebuild repairs the rollup
+        logger.warning("Rollup update failed: %s", e, extra={"student_id": student_id})
+
+async def apply_attendance(student_id: str, subject: str, status: str, previous: dict = None):
+    """
+    Fold one attendance mark into the student's rollup.
+    previous is the attendance document this write replaced (if any).
+    """
+    increments = {}
+    add_attendance_increments(increments, student_id, subject, status, previous)
+    try:
+        await apply_rollup_increments(increments)
+    except Exception as e:
+        logger.warning("Rollup update failed: %s", e, extra={"student_id": student_id})
+
+def _grade_value_stages(match: dict) -> list:
+    """
+    Pipeline stages yielding the numeric grades matching match as
+    {student_id, subject (rollup key), value}, oldest first.
+    """
+    return [
+        {"$match": match},
+        {"$project": {
+            "student_id": 1,
+            "subject": ROLLUP_SUBJECT_EXPRESSION,
+            "value": {"$ifNull": ["$grade", "$score"]},
+            "timestamp": 1
+        }},
+        {"$match": {"value": {"$type": "number"}}},
+        {"$sort": {"timestamp": 1, "_id": 1}}
+    ]
+
+async def refresh_grade_stats(keys: list):
+    """
+    Recompute grade_min, grade_max, last_grade and recent_grades of the given
+    (student_id, subject) rollups from the raw grades.
+    """
+    keys = set(keys)
+    if not keys:
+        return
+    stats = {key: {"grade_min": None, "grade_max": None, "last_grade": None, "recent_grades": []} for key in keys}
+    pipeline = _grade_value_stages({"student_id": {"$in": sorted({student_id for student_id, _ in keys})}}) + [
+        {"$match": {"subject": {"$in": sorted({subject for _, subject in keys})}}},
+        {"$group": {
+            "_id": {"student_id": "$student_id", "subject": "$subject"},
+            "grade_min": {"$min": "$value"},
+            "grade_max": {"$max": "$value"},
+            "last_grade": {"$last": "$value"},
+            "values": {"$push": "$value"}
+        }}
+    ]
+    async for row in grades_collection.aggregate(pipeline):
+        key = (row["_id"]["student_id"], row["_id"]["subject"])
+        if key in stats:
+            stats[key] = {
+                "grade_min": row["grade_min"],
+                "grade_max": row["grade_max"],
+                "last_grade": row["last_grade"],
+                "recent_grades": row["values"][-ROLLUP_WINDOW:]
+            }
+
+    await student_rollups_collection.bulk_write([
+        UpdateOne({"student_id": student_id, "subject": subject}, {"$set": fields})
+        for (student_id, subject), fields in stats.items()
+    ], ordered=False)
+
+def format_rollup(rollup: dict) -> dict:
+    """
+    Shape a rollup document for API responses, adding the derived averages.
+    """
+    grade_count = rollup.get("grade_count", 0)
+    attendance_count = rollup.get("attendance_count", 0)
+    present_count = rollup.get("present_count", 0)
+    recent = rollup.get("recent_grades", [])
+    return {
+        "student_id": rollup["student_id"],
+        "subject": rollup["subject"],
+        "grade_count": grade_count,
+        "grade_sum": rollup.get("grade_sum", 0),
+        "average_grade": round(rollup.get("grade_sum", 0) / grade_count, 2) if grade_count > 0 else None,
+        "grade_min": rollup.get("grade_min"),
+        "grade_max": rollup.get("grade_max"),
+        "last_grade": rollup.get("last_grade"),
+        "moving_average": round(sum(recent) / len(recent), 2) if recent else None,
+        "attendance_count": attendance_count,
+        "present_count": present_count,
+        "absent_count": rollup.get("absent_count", 0),
+        "attendance_rate": round((present_count / attendance_count) * 100, 2) if attendance_count > 0 else 0,
+        "updated_at": rollup.get("updated_at")
+    }
+
+async def get_student_rollups(student_id: str, subject: str = None) -> list:
+    """
+    Rollup documents for a student (every subject, or just one).
+    """
+    query = {"student_id": student_id}
+    if subject:
+        query["subject"] = subject
+    rollups = student_rollups_collection.find(query, {"_id": 0}).sort("subject", 1)
+    return await rollups.to_list(length=None)
+
+async def compute_rollups(student_ids: list = None) -> dict:
+    """
+    Recompute rollups from the raw grades and attendance rows
+    (for every student, or only the given ones).
+    Returns {(student_id, subject): rollup document}.
+    """
+    match = {"student_id": {"$in": list(student_ids)}} if student_ids is not None else {}
+    grade_pipeline = _grade_value_stages(match) + [
+        {"$group": {
+            "_id": {"student_id": "$student_id", "subject": "$subject"},
+            "grade_count": {"$sum": 1},
+            "grade_sum": {"$sum": "$value"},
+            "grade_min": {"$min": "$value"},
+            "grade_max": {"$max": "$value"},
+            "last_grade": {"$last": "$value"},
+            "values": {"$push": "$value"}
+        }}
+    ]
+    attendance_pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {"student_id": "$student_id", "subject": ROLLUP_SUBJECT_EXPRESSION},
+            "attendance_count": {"$sum": 1},
+            "present_count": {"$sum": {"$cond": [{"$eq": ["$status", "present"]}, 1, 0]}},
+            "absent_count": {"$sum": {"$cond": [{"$eq": ["$status", "absent"]}, 1, 0]}}
+        }}
+    ]
+
+    rollups = {}
+    def rollup_for(key: dict) -> dict:
+        return rollups.setdefault(
+            (key["student_id"], key["subject"]),
+            {"student_id": key["student_id"], "subject": key["subject"]}
+        )
+
+    async for row in grades_collection.aggregate(grade_pipeline, allowDiskUse=True):
+        values = row.pop("values")
+        rollup = rollup_for(row.pop("_id"))
+        rollup.update(row)
+        rollup["recent_grades"] = values[-ROLLUP_WINDOW:]
+
+    async for row in attendance_collection.aggregate(attendance_pipeline, allowDiskUse=True):
+        rollup_for(row.pop("_id")).update(row)
+
+    return rollups
+
+def _differs(expected, actual) -> bool:
+    if _is_number(expected) and _is_number(actual):
+        return abs(expected - actual) > 1e-6
+    return expected != actual
+
+async def verify_rollups() -> list:
+    """
+    Compare the stored rollups with a fresh recomputation.
+    Returns human readable difference messages (empty when consistent).
+    """
+    expected = await compute_rollups()
+    differences = []
+
+    async for stored in student_rollups_collection.find({}, {"_id": 0}):
+        key = (stored["student_id"], stored["subject"])
+        fresh = expected.pop(key, None)
+        if fresh is None:
+            differences.append(f"{key}: rollup has no raw data")
+            continue
+        for field in ROLLUP_FIELDS:
+            default = [] if field == "recent_grades" else (None if field in ("grade_min", "grade_max", "last_grade") else 0)
+            if _differs(fresh.get(field, default), stored.get(field, default)):
+                differences.append(f"{key}: {field} is {stored.get(field)!r}, expected {fresh.get(field, default)!r}")
+
+    for key in expected:
+        differences.append(f"{key}: rollup missing")
+    return differences
+
+async def rebuild_rollups(batch_size: int = 500) -> int:
+    """
+    Replace every rollup with one recomputed from raw data and drop rollups
+    that no longer have any. Returns the number of rollups written.
+    Maintenance only: incremental updates landing while it runs are overwritten.
+    """
+    started = datetime.utcnow()
+    rollups = await compute_rollups()
+
+    batch = []
+    for (student_id, subject), rollup in rollups.items():
+        rollup["updated_at"] = started
+        batch.append(ReplaceOne({"student_id": student_id, "subject": subject}, rollup, upsert=True))
+        if len(batch) >= batch_size:
+            await student_rollups_collection.bulk_write(batch, ordered=False)
+            batch = []
+    if batch:
+        await student_rollups_collection.bulk_write(batch, ordered=False)
+
+    # Anything not touched by this rebuild has no raw rows left
+    await student_rollups_collection.delete_many({"updated_at": {"$lt": started}})
+    return len(rollups)
+
+async def _main(args: list) -> int:
+    if "--rebuild" in args:
+        written = await rebuild_rollups()
+        print(f"✅ Rebuilt {written} rollups")
+        return 0
+
+    differences = await verify_rollups()
+    for message in differences:
+        print(f"⚠️  {message}")
+    if not differences:
+        print("✅ Rollups match the raw data")
+    return 1 if differences else 0
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main(sys.argv[1:])))
@@ -1,14 +1,25 @@
 from config import users_collection
 from models.schemas_auth import UserCreate, UserResponse
-from auth_utils import get_password_hash, verify_password
+from auth_utils import hash_password, verify_and_update_password
 from datetime import datetime
+from utils.cache import TTLCache
 import uuid
+import os
 from bson import ObjectId
 
-def create_user(user_data: UserCreate) -> dict:
+# Short-lived profile cache for get_user_by_id (/api/auth/me on every page load)
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", "60"))
+_user_cache = TTLCache(USER_CACHE_MAX_ENTRIES, USER_CACHE_TTL_SECONDS)
+
+def invalidate_user_cache(user_id: str):
+    """Drop a cached profile; call after every write to that user."""
+    _user_cache.pop(user_id)
+
+async def create_user(user_data: UserCreate) -> dict:
     """Create a new user in MongoDB."""
     # Check if user already exists
-    existing_user = users_collection.find_one({"email": user_data.email})
+    existing_user = await users_collection.find_one({"email": user_data.email})
     if existing_user:
         raise ValueError("User with this email already exists")
     
@@ -19,13 +30,13 @@ def create_user(user_data: UserCreate) -> dict:
         "email": user_data.email,
         "full_name": user_data.full_name,
         "role": user_data.role,
-        "hashed_password": get_password_hash(user_data.password),
+        "hashed_password": await hash_password(user_data.password),
         "is_active": True,
         "created_at": datetime.utcnow()  # Make sure this is included
     }
     
     # Insert into MongoDB
-    result = users_collection.insert_one(user_doc)
+    result = await users_collection.insert_one(user_doc)
     
     # Return user data (without password)
     return {
@@ -37,17 +48,22 @@ def create_user(user_data: UserCreate) -> dict:
         "is_active": True
     }
 
-def authenticate_user(email: str, password: str) -> dict:
+async def authenticate_user(email: str, password: str) -> dict:
     """Authenticate a user and return user data if valid."""
-    user = users_collection.find_one({"email": email})
+    user = await users_collection.find_one({"email": email})
     if not user:
         return None
     
-    if not verify_password(password, user["hashed_password"]):
+    is_valid, new_hash = await verify_and_update_password(password, user["hashed_password"])
+    if not is_valid:
         return None
     
     if not user.get("is_active", True):
         return None
+
+    # Transparently upgrade hashes made with an older bcrypt cost
+    if new_hash:
+        await update_user(user["user_id"], {"hashed_password": new_hash})
     
     # Return user data without password
     return {
@@ -58,13 +74,17 @@ def authenticate_user(email: str, password: str) -> dict:
         "created_at": user["created_at"]  # Include created_at
     }
 
-def get_user_by_id(user_id: str) -> dict:
-    """Get user by ID."""
-    user = users_collection.find_one({"user_id": user_id})
+async def get_user_by_id(user_id: str) -> dict:
+    """Get user by ID (served from a short-TTL cache when possible)."""
+    cached = _user_cache.get(user_id)
+    if cached is not None:
+        return dict(cached)
+
+    user = await users_collection.find_one({"user_id": user_id}, {"hashed_password": 0})
     if not user:
         return None
     
-    return {
+    profile = {
         "user_id": user["user_id"],
         "email": user["email"],
         "full_name": user["full_name"],
@@ -72,10 +92,18 @@ def get_user_by_id(user_id: str) -> dict:
         "created_at": user["created_at"],  # Include created_at
         "is_active": user.get("is_active", True)
     }
+    _user_cache.set(user_id, profile)
+    return dict(profile)
+
+async def update_user(user_id: str, fields: dict) -> bool:
+    """Update fields of a user and drop their cached profile."""
+    result = await users_collection.update_one({"user_id": user_id}, {"$set": fields})
+    invalidate_user_cache(user_id)
+    return result.matched_count > 0
 
-def get_user_by_email(email: str) -> dict:
+async def get_user_by_email(email: str) -> dict:
     """Get user by email."""
-    user = users_collection.find_one({"email": email})
+    user = await users_collection.find_one({"email": email})
     if not user:
         return None
     
@@ -0,0 +1,62 @@
+import time
+import threading
+from collections import OrderedDict
+
+class TTLCache:
+    """
+    Small in-process LRU cache whose entries also expire after a time-to-live.
+    Safe to share between the event loop and threadpool workers.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the cached value for key, or default if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+
+            # Mark as most recently used
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds: float = None):
+        """
+        Store a value, evicting the least recently used entries when full.
+        """
+        if self.max_entries <= 0:
+            return
+
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """
+        Remove a key and return its value (expired or not).
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+        return entry[0] if entry else default
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
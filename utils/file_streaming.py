@@ -0,0 +1,92 @@
+import os
+import re
+import urllib.parse
+from typing import Optional
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+# Bytes read from GridFS per iteration (GridFS stores 255 KB chunks)
+DOWNLOAD_CHUNK_SIZE = int(os.getenv("DOWNLOAD_CHUNK_SIZE", str(256 * 1024)))
+
+_RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def parse_range_header(range_header: Optional[str], size: int) -> Optional[tuple]:
+    """
+    Parse a single-range "Range: bytes=start-end" header into an inclusive
+    (start, end) pair. Returns None when the whole file should be sent
+    (no header, multiple ranges or a syntax we do not understand).
+    Raises HTTPException(416) when the range cannot be satisfied.
+    """
+    if not range_header:
+        return None
+
+    match = _RANGE_PATTERN.match(range_header.strip())
+    if not match:
+        return None
+
+    start_text, end_text = match.groups()
+    if not start_text and not end_text:
+        return None
+
+    if not start_text:
+        # Suffix range: the last N bytes
+        length = int(end_text)
+        if length == 0:
+            raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+        start, end = max(size - length, 0), size - 1
+    else:
+        start = int(start_text)
+        end = min(int(end_text), size - 1) if end_text else size - 1
+
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable", headers={"Content-Range": f"bytes */{size}"})
+    return start, end
+
+async def iter_grid_out(grid_out, start: int, end: int, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+    """
+    Yield bytes [start, end] of a (Motor) GridFS file one chunk at a time.
+    """
+    try:
+        grid_out.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            data = await grid_out.read(min(chunk_size, remaining))
+            if not data:
+                break
+            remaining -= len(data)
+            yield data
+    finally:
+        grid_out.close()
+
+def build_download_response(grid_out, filename: str, range_header: Optional[str] = None) -> StreamingResponse:
+    """
+    Stream a Motor GridFS file as an attachment, honouring a single byte range
+    with 206 Partial Content.
+    """
+    size = grid_out.length
+    try:
+        byte_range = parse_range_header(range_header, size)
+    except HTTPException:
+        grid_out.close()
+        raise
+
+    encoded_filename = urllib.parse.quote(filename)
+    headers = {
+        "Content-Disposition": f"attachment; filename*=UTF-8''{encoded_filename}",
+        "Accept-Ranges": "bytes"
+    }
+
+    if byte_range is None:
+        start, end, status_code = 0, size - 1, 200
+    else:
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(max(end - start + 1, 0))
+
+    return StreamingResponse(
+        iter_grid_out(grid_out, start, end),
+        status_code=status_code,
+        media_type="application/octet-stream",
+        headers=headers
+    )
@@ -0,0 +1,111 @@
+import logging
+import os
+import json
+import hashlib
+from datetime import datetime, timedelta
+from config import llm_cache_collection
+from .cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Cache settings
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+LLM_CACHE_TTL_SECONDS = int(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# In-process tier (fast, per worker) in front of the shared MongoDB tier
+_memory_cache = TTLCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
+
+_stats = {
+    "memory_hits": 0,
+    "mongo_hits": 0,
+    "misses": 0,
+    "stores": 0,
+    "errors": 0
+}
+
+def make_cache_key(model_type: str, generation_config: dict, prompt: str) -> str:
+    """
+    Build a content-addressed key from the model, generation config and prompt.
+    """
+    payload = json.dumps(
+        {"model": model_type, "config": generation_config, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+async def get_cached_response(cache_key: str):
+    """
+    Look up a cached LLM response, memory first and MongoDB second.
+    Returns None on a miss.
+    """
+    if not LLM_CACHE_ENABLED:
+        return None
+
+    response = _memory_cache.get(cache_key)
+    if response is not None:
+        _stats["memory_hits"] += 1
+        return response
+
+    try:
+        # The TTL index (see indexes.py) is only swept once a minute, so check the age here as well
+        min_created_at = datetime.utcnow() - timedelta(seconds=LLM_CACHE_TTL_SECONDS)
+        doc = await llm_cache_collection.find_one(
+            {"cache_key": cache_key, "created_at": {"$gte": min_created_at}},
+            {"response": 1, "_id": 0}
+        )
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning("LLM cache lookup failed: %s", e)
+        doc = None
+
+    if doc:
+        _stats["mongo_hits"] += 1
+        _memory_cache.set(cache_key, doc["response"])
+        return doc["response"]
+
+    _stats["misses"] += 1
+    return None
+
+async def store_cached_response(cache_key: str, model_type: str, response: str):
+    """
+    Save an LLM response in both cache tiers.
+    """
+    if not LLM_CACHE_ENABLED:
+        return
+
+    _memory_cache.set(cache_key, response)
+    try:
+        await llm_cache_collection.update_one(
+            {"cache_key": cache_key},
+            {"$set": {
+                "cache_key": cache_key,
+                "model": model_type,
+                "response": response,
+                "created_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+        _stats["stores"] += 1
+    except Exception as e:
+        _stats["errors"] += 1
+        logger.warning("LLM cache store failed: %s", e)
+
+def get_cache_stats() -> dict:
+    """
+    Return hit/miss counters for the LLM cache.
+    """
+    hits = _stats["memory_hits"] + _stats["mongo_hits"]
+    lookups = hits + _stats["misses"]
+    return {
+        **_stats,
+        "memory_entries": len(_memory_cache),
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0
+    }
+
+def clear_memory_cache():
+    """
+    Drop the in-process tier (the MongoDB tier is left untouched).
+    """
+    _memory_cache.clear()
@@ -1,58 +1,184 @@
+import logging
 import os
-import google.generativeai as genai
+import time
+import asyncio
 from dotenv import load_dotenv
+from .llm_cache import make_cache_key, get_cached_response, store_cached_response
+from .llm_providers import get_provider
+from .metrics import observe_llm_call
+
+logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-# Configure Gemini
-gemini_api_key = os.getenv("GEMINI_API_KEY")
-if gemini_api_key:
-    genai.configure(api_key=gemini_api_key)
-    print("✅ Gemini AI configured successfully")
-else:
-    print("❌ GEMINI_API_KEY not found in environment variables")
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+# Maximum number of LLM calls allowed in flight at once (per process)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+# Upper bound on a single LLM call, in seconds
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+
+GENERATION_PARAMS = {
+    "temperature": 0.7,
+    "max_output_tokens": 1500,
+}
+
+class LLMError(Exception):
+    """Raised by the streaming client when the LLM cannot produce an answer."""
 
-def call_llm(prompt: str, model_type: str = "gemini-2.0-flash") -> str:
+_llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Marks the end of a drained stream in the chunk queue
+_STREAM_DONE = object()
+
+def is_llm_error(response: str) -> bool:
     """
-    Make a call to Google Gemini with the given prompt.
+    True when call_llm returned one of its error messages instead of an answer.
+    """
+    return response.startswith("Error: ") or response.startswith("Error calling ")
+
+async def call_llm(prompt: str, model_type: str = DEFAULT_MODEL, use_cache: bool = True) -> str:
     """
-    if not gemini_api_key:
-        return "Error: Gemini API key not configured. Please set GEMINI_API_KEY in your .env file"
-    
+    Make a non-blocking call to the configured LLM provider (LLM_PROVIDER,
+    Gemini by default) with the given prompt.
+    At most LLM_MAX_CONCURRENCY calls run at the same time; the rest wait their turn.
+    Identical (model, config, prompt) requests are answered from the LLM cache.
+    Latency (including the wait for a free slot), outcome and sizes are
+    recorded in the metrics registry.
+    """
+    provider = get_provider()
+    configuration_error = provider.configuration_error()
+    if configuration_error:
+        return f"Error: {configuration_error}"
+
+    started = time.perf_counter()
+    model_label = provider.model_label(model_type)
+    cache_key = make_cache_key(model_label, GENERATION_PARAMS, prompt)
+    if use_cache:
+        cached = await get_cached_response(cache_key)
+        if cached is not None:
+            observe_llm_call(model_label, "cache_hit", started, prompt, cached)
+            return cached
+
     try:
-        # Use the latest model naming
-        model = genai.GenerativeModel(model_type)
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=0.7,
-                max_output_tokens=1500,
+        async with _llm_semaphore:
+            response = await asyncio.wait_for(
+                provider.generate(prompt, model_type, GENERATION_PARAMS),
+                timeout=LLM_TIMEOUT_SECONDS
             )
-        )
-        return response.text.strip()
-    
+        text = response.strip()
+
+    except asyncio.TimeoutError:
+        logger.warning("LLM call timed out", extra={"model": model_label, "timeout_seconds": LLM_TIMEOUT_SECONDS})
+        observe_llm_call(model_label, "timeout", started, prompt)
+        return f"Error calling {provider.display_name}: request timed out after {LLM_TIMEOUT_SECONDS:g}s"
     except Exception as e:
-        return f"Error calling Gemini: {str(e)}"
+        logger.warning("LLM call failed: %s", e, extra={"model": model_label})
+        observe_llm_call(model_label, "error", started, prompt)
+        return f"Error calling {provider.display_name}: {str(e)}"
+
+    observe_llm_call(model_label, "success", started, prompt, text)
+
+    # Only successful answers are cached, errors are retried next time
+    if use_cache:
+        await store_cached_response(cache_key, model_label, text)
+    return text
+
+async def _drain_stream(provider, prompt: str, model_type: str, chunks: asyncio.Queue) -> None:
+    """
+    Read a provider stream into chunks while holding an LLM slot.
+    Ends with _STREAM_DONE, or with the exception that stopped the stream.
+    The answer is capped by max_output_tokens, so the queue is left unbounded.
+    """
+    try:
+        async with _llm_semaphore:
+            fragments = provider.stream(prompt, model_type, GENERATION_PARAMS)
+            try:
+                while True:
+                    # Bound the wait for each fragment, a stalled stream times out
+                    try:
+                        text = await asyncio.wait_for(fragments.__anext__(), timeout=LLM_TIMEOUT_SECONDS)
+                    except StopAsyncIteration:
+                        break
+                    if text:
+                        chunks.put_nowait(text)
+            finally:
+                await fragments.aclose()
+    except Exception as e:
+        chunks.put_nowait(e)
+        return
+    chunks.put_nowait(_STREAM_DONE)
+
+async def stream_llm(prompt: str, model_type: str = DEFAULT_MODEL, use_cache: bool = True):
+    """
+    Stream an answer from the configured LLM provider as it is generated,
+    yielding text fragments.
+    A cached answer is yielded in one piece. Raises LLMError on failure.
+    """
+    provider = get_provider()
+    configuration_error = provider.configuration_error()
+    if configuration_error:
+        raise LLMError(configuration_error)
+
+    started = time.perf_counter()
+    model_label = provider.model_label(model_type)
+    cache_key = make_cache_key(model_label, GENERATION_PARAMS, prompt)
+    if use_cache:
+        cached = await get_cached_response(cache_key)
+        if cached is not None:
+            observe_llm_call(model_label, "cache_hit", started, prompt, cached)
+            yield cached
+            return
+
+    # The slot is held only while the provider is read; a slow reader
+    # drains the buffered answer without keeping other callers waiting
+    chunks = asyncio.Queue()
+    producer = asyncio.create_task(_drain_stream(provider, prompt, model_type, chunks))
+    parts = []
+    try:
+        while True:
+            item = await chunks.get()
+            if item is _STREAM_DONE:
+                break
+            if isinstance(item, Exception):
+                raise item
+            parts.append(item)
+            yield item
+
+    except asyncio.TimeoutError:
+        observe_llm_call(model_label, "timeout", started, prompt)
+        raise LLMError(f"request timed out after {LLM_TIMEOUT_SECONDS:g}s")
+    except Exception as e:
+        observe_llm_call(model_label, "error", started, prompt)
+        raise LLMError(str(e)) from e
+    finally:
+        # Stops the upstream read when the consumer goes away early
+        producer.cancel()
+
+    observe_llm_call(model_label, "success", started, prompt, "".join(parts))
+
+    if use_cache:
+        await store_cached_response(cache_key, model_label, "".join(parts).strip())
 
-def generate_quiz_with_llm(subject: str, level: str, material_text: str, num_questions: int = 5) -> str:
+async def generate_quiz_with_llm(subject: str, level: str, material_text: str, num_questions: int = 5) -> str:
     """
-    Direct function to generate quiz using Gemini.
+    Direct function to generate quiz using the LLM.
     """
     from .llm_templates import generate_quiz_prompt
     prompt = generate_quiz_prompt(subject, level, material_text, num_questions)
-    return call_llm(prompt)
+    return await call_llm(prompt)
 
-def generate_summary_with_llm(subject: str, lecture_number: int, content: str) -> str:
+async def generate_summary_with_llm(subject: str, lecture_number: int, content: str) -> str:
     """
-    Direct function to generate summary using Gemini.
+    Direct function to generate summary using the LLM.
     """
     from .llm_templates import generate_summary_prompt
     prompt = generate_summary_prompt(subject, lecture_number, content)
-    return call_llm(prompt)
+    return await call_llm(prompt)
 
 # Backward compatibility functions
-def generate_quiz_from_material(material_text: str) -> str:
+async def generate_quiz_from_material(material_text: str) -> str:
     """
-    Generate quiz using Gemini (compatible with existing code).
+    Generate quiz using the LLM (compatible with existing code).
     """
-    return generate_quiz_with_llm("General", "Intermediate", material_text)
\ No newline at end of file
+    return await generate_quiz_with_llm("General", "Intermediate", material_text)
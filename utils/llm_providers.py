@@ -0,0 +1,292 @@
+"""
+LLM backends behind utils.llm_client.call_llm / stream_llm.
+
+LLM_PROVIDER picks the backend for the process:
+
+    gemini   Google Gemini (default), needs GEMINI_API_KEY
+    stub     local deterministic stand-in, no network or key; answers are
+             derived from the prompt and delivered with simulated latency:
+
+    LLM_STUB_LATENCY_DISTRIBUTION  constant, uniform, normal or lognormal (default)
+    LLM_STUB_LATENCY_MS            median time to the first token (default 800)
+    LLM_STUB_LATENCY_SPREAD        uniform: +/- fraction of the median, normal:
+                                   stddev as a fraction of it, lognormal: sigma
+                                   (default 0.5)
+    LLM_STUB_TOKENS_PER_SECOND     generation speed after the first token (default 60)
+    LLM_STUB_RESPONSE_TOKENS       answer length, capped by max_output_tokens (default 400)
+    LLM_STUB_FAILURE_RATE          fraction of calls that fail (default 0)
+    LLM_STUB_SEED                  seed of the latency/failure sequence (default 0)
+
+Caching, the concurrency limit, timeouts and metrics stay in llm_client,
+so the stub exercises the same request path as the real backend.
+"""
+import os
+import re
+import math
+import random
+import asyncio
+import hashlib
+import logging
+import google.generativeai as genai
+from abc import ABC, abstractmethod
+from typing import Optional
+from dotenv import load_dotenv
+from .text_chunker import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+
+LLM_STUB_LATENCY_DISTRIBUTION = os.getenv("LLM_STUB_LATENCY_DISTRIBUTION", "lognormal").lower()
+LLM_STUB_LATENCY_MS = float(os.getenv("LLM_STUB_LATENCY_MS", "800"))
+LLM_STUB_LATENCY_SPREAD = float(os.getenv("LLM_STUB_LATENCY_SPREAD", "0.5"))
+LLM_STUB_TOKENS_PER_SECOND = float(os.getenv("LLM_STUB_TOKENS_PER_SECOND", "60"))
+LLM_STUB_RESPONSE_TOKENS = int(os.getenv("LLM_STUB_RESPONSE_TOKENS", "400"))
+LLM_STUB_FAILURE_RATE = float(os.getenv("LLM_STUB_FAILURE_RATE", "0"))
+LLM_STUB_SEED = int(os.getenv("LLM_STUB_SEED", "0"))
+
+# Tokens per streamed fragment
+STUB_STREAM_CHUNK_TOKENS = 16
+
+LATENCY_DISTRIBUTIONS = ("constant", "uniform", "normal", "lognormal")
+
+class LLMProviderError(Exception):
+    """Raised by a backend that could not produce an answer."""
+
+class LLMProvider(ABC):
+    """
+    A text generation backend. generate() returns the whole answer,
+    stream() yields it in fragments (an async generator); both raise on failure.
+    """
+
+    name = ""
+    display_name = ""
+
+    def configuration_error(self) -> Optional[str]:
+        """
+        Why the backend cannot be used (missing key...), or None when it is ready.
+        """
+        return None
+
+    def model_label(self, model_type: str) -> str:
+        """
+        Model name used for cache keys and metrics labels.
+        """
+        return model_type
+
+    @abstractmethod
+    async def generate(self, prompt: str, model_type: str, params: dict) -> str:
+        ...
+
+    @abstractmethod
+    def stream(self, prompt: str, model_type: str, params: dict):
+        ...
+
+class GeminiProvider(LLMProvider):
+    """
+    Google Gemini through google.generativeai.
+    """
+
+    name = "gemini"
+    display_name = "Gemini"
+
+    def __init__(self, api_key: str = None):
+        self.api_key = api_key if api_key is not None else os.getenv("GEMINI_API_KEY")
+        if self.api_key:
+            genai.configure(api_key=self.api_key)
+            logger.info("Gemini AI configured")
+        else:
+            logger.error("GEMINI_API_KEY not found in environment variables")
+        # Model objects (and the gRPC transport behind them) are reused across calls
+        self._models = {}
+        self._configs = {}
+
+    def configuration_error(self) -> Optional[str]:
+        if not self.api_key:
+            return "Gemini API key not configured. Please set GEMINI_API_KEY in your .env file"
+        return None
+
+    def get_model(self, model_type: str) -> genai.GenerativeModel:
+        """
+        Return the shared GenerativeModel for a model name, creating it on first use.
+        """
+        model = self._models.get(model_type)
+        if model is None:
+            model = genai.GenerativeModel(model_type)
+            self._models[model_type] = model
+        return model
+
+    def _generation_config(self, params: dict) -> genai.types.GenerationConfig:
+        key = tuple(sorted(params.items()))
+        config = self._configs.get(key)
+        if config is None:
+            config = self._configs[key] = genai.types.GenerationConfig(**params)
+        return config
+
+    async def generate(self, prompt: str, model_type: str, params: dict) -> str:
+        response = await self.get_model(model_type).generate_content_async(
+            prompt, generation_config=self._generation_config(params)
+        )
+        return response.text
+
+    async def stream(self, prompt: str, model_type: str, params: dict):
+        response = await self.get_model(model_type).generate_content_async(
+            prompt, generation_config=self._generation_config(params), stream=True
+        )
+        async for chunk in response:
+            yield chunk.text
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic local backend for load and capacity tests. The answer is
+    a function of the prompt; latency and failures follow the configured
+    distribution from a seeded random sequence.
+    """
+
+    name = "stub"
+    display_name = "stub LLM"
+
+    def __init__(
+        self,
+        latency_distribution: str = LLM_STUB_LATENCY_DISTRIBUTION,
+        latency_ms: float = LLM_STUB_LATENCY_MS,
+        latency_spread: float = LLM_STUB_LATENCY_SPREAD,
+        tokens_per_second: float = LLM_STUB_TOKENS_PER_SECOND,
+        response_tokens: int = LLM_STUB_RESPONSE_TOKENS,
+        failure_rate: float = LLM_STUB_FAILURE_RATE,
+        seed: int = LLM_STUB_SEED
+    ):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(
+                f"Unknown LLM_STUB_LATENCY_DISTRIBUTION '{latency_distribution}'. Use one of: {', '.join(LATENCY_DISTRIBUTIONS)}"
+            )
+        self.latency_distribution = latency_distribution
+        self.latency_ms = max(latency_ms, 0.0)
+        self.latency_spread = max(latency_spread, 0.0)
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = max(response_tokens, 1)
+        self.failure_rate = min(max(failure_rate, 0.0), 1.0)
+        self._rng = random.Random(seed)
+        logger.warning(
+            "Using the stub LLM provider, answers are synthetic",
+            extra={
+                "latency_distribution": self.latency_distribution,
+                "latency_ms": self.latency_ms,
+                "tokens_per_second": self.tokens_per_second,
+                "failure_rate": self.failure_rate
+            }
+        )
+
+    def model_label(self, model_type: str) -> str:
+        # Keep stub answers apart from real ones in the shared cache and in metrics
+        return f"stub/{model_type}"
+
+    def sample_first_token_seconds(self) -> float:
+        """
+        Draw one time-to-first-token from the configured distribution.
+        """
+        median = self.latency_ms / 1000
+        spread = self.latency_spread
+        if self.latency_distribution == "constant" or median == 0:
+            return median
+        if self.latency_distribution == "uniform":
+            return max(0.0, self._rng.uniform(median * (1 - spread), median * (1 + spread)))
+        if self.latency_distribution == "normal":
+            return max(0.0, self._rng.gauss(median, median * spread))
+        return self._rng.lognormvariate(math.log(median), spread)
+
+    def _generation_seconds(self, tokens: int) -> float:
+        if self.tokens_per_second <= 0:
+            return 0.0
+        return tokens / self.tokens_per_second
+
+    def _should_fail(self) -> bool:
+        return self.failure_rate > 0 and self._rng.random() < self.failure_rate
+
+    def _answer_tokens(self, params: dict) -> int:
+        return min(self.response_tokens, int(params.get("max_output_tokens") or self.response_tokens))
+
+    async def generate(self, prompt: str, model_type: str, params: dict) -> str:
+        first_token = self.sample_first_token_seconds()
+        failing = self._should_fail()
+        text = build_stub_answer(prompt, self._answer_tokens(params))
+        if failing:
+            await asyncio.sleep(first_token)
+            raise LLMProviderError("injected failure (LLM_STUB_FAILURE_RATE)")
+        await asyncio.sleep(first_token + self._generation_seconds(estimate_tokens(text)))
+        return text
+
+    async def stream(self, prompt: str, model_type: str, params: dict):
+        first_token = self.sample_first_token_seconds()
+        failing = self._should_fail()
+        text = build_stub_answer(prompt, self._answer_tokens(params))
+        await asyncio.sleep(first_token)
+        if failing:
+            raise LLMProviderError("injected failure (LLM_STUB_FAILURE_RATE)")
+
+        chunk_chars = STUB_STREAM_CHUNK_TOKENS * CHARS_PER_TOKEN
+        for start in range(0, len(text), chunk_chars):
+            chunk = text[start:start + chunk_chars]
+            if start:
+                await asyncio.sleep(self._generation_seconds(estimate_tokens(chunk)))
+            yield chunk
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z'-]{3,}")
+_QUESTION_COUNT = re.compile(r"Create (\d+) multiple-choice questions")
+
+def build_stub_answer(prompt: str, max_tokens: int) -> str:
+    """
+    Synthetic answer made from the prompt's own words: the requested number
+    of multiple-choice questions for quiz prompts, about max_tokens tokens
+    of bullet points otherwise. The same prompt always gives the same answer.
+    """
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).digest())
+    words = _WORD.findall(prompt)[-2000:] or ["lecture", "concept", "example", "definition"]
+    max_chars = max_tokens * CHARS_PER_TOKEN
+
+    question_count = _QUESTION_COUNT.search(prompt)
+    if question_count:
+        questions = []
+        for number in range(1, int(question_count.group(1)) + 1):
+            options = "\n".join(f"{letter}) {' '.join(rng.choices(words, k=3))}" for letter in "ABCD")
+            questions.append(
+                f"{number}. What does the material say about {rng.choice(words)} and {rng.choice(words)}?\n"
+                f"{options}\nCorrect Answer: {rng.choice('ABCD')}"
+            )
+        return "\n\n".join(questions)
+
+    lines = []
+    size = 0
+    while size < max_chars:
+        line = "- " + " ".join(rng.choices(words, k=rng.randint(8, 16))).capitalize() + "."
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)[:max_chars].strip()
+
+PROVIDERS = {
+    GeminiProvider.name: GeminiProvider,
+    StubProvider.name: StubProvider
+}
+
+_provider = None
+
+def get_provider() -> LLMProvider:
+    """
+    The backend selected by LLM_PROVIDER, created on first use.
+    """
+    global _provider
+    if _provider is None:
+        provider_class = PROVIDERS.get(LLM_PROVIDER)
+        if provider_class is None:
+            raise ValueError(f"Unknown LLM_PROVIDER '{LLM_PROVIDER}'. Use one of: {', '.join(PROVIDERS)}")
+        _provider = provider_class()
+    return _provider
+
+def set_provider(provider: LLMProvider):
+    """
+    Replace the process-wide backend (load tests, benchmarks).
+    """
+    global _provider
+    _provider = provider
@@ -46,6 +46,50 @@ def generate_summary_prompt(subject: str, lecture_number: int, content: str) ->
     5. Maintains the core educational value
     6. Uses clear, academic language
 
+    Return only the summary content without introductory text.
+    """
+    return prompt
+
+def generate_section_summary_prompt(subject: str, lecture_number: int, section_text: str, section_number: int, section_count: int) -> str:
+    """
+    Generate a prompt that summarizes one section of a long lecture (map step).
+    """
+    prompt = f"""
+    You are summarizing part {section_number} of {section_count} of a lecture for {subject}, Lecture {lecture_number}.
+
+    LECTURE SECTION:
+    {section_text}
+
+    Please provide a compact summary of this section that:
+    1. Keeps every main concept, definition and example it introduces
+    2. Preserves the order in which topics appear
+    3. Omits slide numbers, headers and repeated boilerplate
+    4. Uses short, factual bullet points
+
+    Return only the bullet points without introductory text.
+    """
+    return prompt
+
+def generate_combined_summary_prompt(subject: str, lecture_number: int, section_summaries: list) -> str:
+    """
+    Generate a prompt that merges section summaries into one lecture summary (reduce step).
+    """
+    sections = "\n\n".join(
+        f"SECTION {index}:\n{summary}" for index, summary in enumerate(section_summaries, start=1)
+    )
+    prompt = f"""
+    The following are summaries of consecutive sections of a lecture for {subject}, Lecture {lecture_number}:
+
+    {sections}
+
+    Please combine them into one concise educational summary that:
+    1. Captures the main concepts and key points of the whole lecture
+    2. Is easy to understand for students
+    3. Highlights important definitions and examples
+    4. Removes repetition between sections
+    5. Maintains the core educational value
+    6. Uses clear, academic language
+
     Return only the summary content without introductory text.
     """
     return prompt
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""
+Application logging.
+
+Records are emitted through a QueueHandler, so the calling coroutine or
+thread only enqueues them; a QueueListener thread formats and writes them
+to stdout. Each record carries the current request id.
+
+    LOG_LEVEL          root level (default INFO)
+    LOG_FORMAT         "json" (default) or "text"
+    LOG_SAMPLE_RATES   per-logger sampling of DEBUG/INFO records,
+                       e.g. "app.access=0.1,auth=0.01"
+
+A single call can also be sampled with extra={"sample_rate": 0.01}.
+Warnings and errors are never sampled.
+"""
+import os
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from .request_context import request_id_var
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+# Attributes every LogRecord has; anything else came in through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "sample_rate"}
+
+_listener = None
+
+def _parse_sample_rates(value: str) -> dict:
+    rates = {}
+    for item in value.split(","):
+        name, _, rate = item.partition("=")
+        if name.strip() and rate.strip():
+            rates[name.strip()] = min(max(float(rate), 0.0), 1.0)
+    return rates
+
+class RequestIdFilter(logging.Filter):
+    """
+    Stamp records with the request id. Runs in the calling context, before
+    the record crosses the queue to the listener thread.
+    """
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of DEBUG/INFO records for the configured loggers
+    (or for calls passing extra={"sample_rate": ...}).
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def _rate_for(self, record) -> float:
+        rate = getattr(record, "sample_rate", None)
+        if rate is not None:
+            return rate
+        name = record.name
+        while name:
+            if name in self.rates:
+                return self.rates[name]
+            name = name.rpartition(".")[0]
+        return 1.0
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate_for(record)
+        return rate >= 1.0 or random.random() < rate
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, message, request_id
+    and any extra= fields.
+    """
+
+    def format(self, record):
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None)
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """
+    Human readable records for local development.
+    """
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s [%(request_id)s] %(message)s")
+
+    def format(self, record):
+        if not hasattr(record, "request_id"):
+            record.request_id = None
+        return super().format(record)
+
+class _PreparingQueueHandler(QueueHandler):
+    """
+    Resolve the message and traceback in the calling thread (the arguments
+    may change later) but keep the extra= fields for the formatter.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+def setup_logging():
+    """
+    Install the queue based handler on the root logger (safe to call twice).
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+
+    log_queue = queue.SimpleQueue()
+    handler = _PreparingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter(_parse_sample_rates(LOG_SAMPLE_RATES)))
+    handler.addFilter(RequestIdFilter())
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(LOG_LEVEL)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging():
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
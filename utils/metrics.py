@@ -0,0 +1,245 @@
+"""
+In-process metrics rendered in the Prometheus text format at GET /metrics.
+
+Three sources feed the registry:
+- MetricsMiddleware: request count and latency per route template
+- MongoCommandListener: command latency and failures per collection/command
+- utils.llm_client: LLM call latency, outcome and prompt/response sizes
+
+Other modules can expose point-in-time values (cache stats, queue depth)
+with register_collector().
+"""
+import time
+import threading
+from collections import defaultdict
+from pymongo import monitoring
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+LLM_BUCKETS = (0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_metrics = []
+_collectors = []
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(names: tuple, values: tuple, extra: dict = None) -> str:
+    pairs = list(zip(names, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+def _format_value(value) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """
+    Monotonic counter with labels.
+    """
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values = defaultdict(float)
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] += amount
+
+    def render(self) -> list:
+        with self._lock:
+            values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in sorted(values.items())]
+
+class Histogram:
+    """
+    Cumulative-bucket histogram with labels.
+    """
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, label_names: tuple = (), buckets: tuple = HTTP_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts, then sum and count
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            snapshot = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+
+        lines = []
+        for key, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, {'le': _format_value(float(bound))})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.label_names, key, {'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(float(total))}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+def register_collector(collect):
+    """
+    Register a callable returning [(name, type, documentation, labels dict, value)]
+    ("counter" or "gauge") evaluated on every scrape.
+    """
+    _collectors.append(collect)
+
+def render_metrics() -> str:
+    """
+    All metrics in the Prometheus text exposition format (version 0.0.4).
+    """
+    lines = []
+    for metric in _metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.type_name}")
+        lines.extend(metric.render())
+
+    for collect in _collectors:
+        try:
+            samples = collect()
+        except Exception:
+            continue
+        seen = set()
+        for name, type_name, documentation, labels, value in samples:
+            if name not in seen:
+                seen.add(name)
+                lines.append(f"# HELP {name} {documentation}")
+                lines.append(f"# TYPE {name} {type_name}")
+            lines.append(f"{name}{_format_labels(tuple(labels), tuple(labels.values()))} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+# HTTP
+http_requests_total = Counter("http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"))
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"), HTTP_BUCKETS
+)
+
+# MongoDB
+mongodb_command_duration_seconds = Histogram(
+    "mongodb_command_duration_seconds", "MongoDB command latency by collection and command.", ("collection", "command"), MONGO_BUCKETS
+)
+mongodb_command_failures_total = Counter(
+    "mongodb_command_failures_total", "Failed MongoDB commands by collection and command.", ("collection", "command")
+)
+
+# LLM
+llm_requests_total = Counter("llm_requests_total", "LLM calls by model and outcome.", ("model", "outcome"))
+llm_request_duration_seconds = Histogram(
+    "llm_request_duration_seconds", "LLM call latency by model and outcome.", ("model", "outcome"), LLM_BUCKETS
+)
+llm_prompt_chars = Histogram("llm_prompt_chars", "Prompt size in characters.", ("model",), SIZE_BUCKETS)
+llm_response_chars = Histogram("llm_response_chars", "Response size in characters.", ("model",), SIZE_BUCKETS)
+
+def observe_llm_call(model: str, outcome: str, started: float, prompt: str, response: str = None):
+    """
+    Record one LLM call; outcome is "success", "cache_hit", "error" or "timeout".
+    """
+    elapsed = time.perf_counter() - started
+    llm_requests_total.inc(model=model, outcome=outcome)
+    llm_request_duration_seconds.observe(elapsed, model=model, outcome=outcome)
+    llm_prompt_chars.observe(len(prompt), model=model)
+    if response is not None:
+        llm_response_chars.observe(len(response), model=model)
+
+def _route_template(scope) -> str:
+    """
+    The path template of the route that handled the request (bounded label
+    cardinality), e.g. /monitoring/grades/{student_id}.
+    """
+    endpoint = scope.get("endpoint")
+    app = scope.get("app")
+    if endpoint is None or app is None:
+        return "unmatched"
+    for route in getattr(app, "routes", []):
+        if getattr(route, "endpoint", None) is endpoint:
+            return route.path
+    return "unmatched"
+
+class MetricsMiddleware:
+    """
+    Count requests and time them per route template and status code.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = _route_template(scope)
+            http_requests_total.inc(method=scope["method"], route=route, status=status_code)
+            http_request_duration_seconds.observe(time.perf_counter() - started, method=scope["method"], route=route)
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Time every MongoDB command. Passed to the client in config.py.
+    """
+
+    def __init__(self):
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def _pop_collection(self, event) -> str:
+        with self._lock:
+            return self._collections.pop((event.connection_id, event.request_id), "")
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        if not isinstance(collection, str):
+            collection = ""
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = collection
+
+    def succeeded(self, event):
+        collection = self._pop_collection(event)
+        mongodb_command_duration_seconds.observe(event.duration_micros / 1e6, collection=collection, command=event.command_name)
+
+    def failed(self, event):
+        collection = self._pop_collection(event)
+        mongodb_command_duration_seconds.observe(event.duration_micros / 1e6, collection=collection, command=event.command_name)
+        mongodb_command_failures_total.inc(collection=collection, command=event.command_name)
@@ -0,0 +1,48 @@
+import base64
+from typing import Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(object_id: ObjectId) -> str:
+    """
+    Turn the last _id of a page into an opaque "after" token.
+    """
+    return base64.urlsafe_b64encode(object_id.binary).decode("ascii").rstrip("=")
+
+def decode_cursor(token: str) -> ObjectId:
+    """
+    Turn an "after" token back into an ObjectId (HTTP 400 if it is invalid).
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        return ObjectId(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, TypeError, InvalidId):
+        raise HTTPException(status_code=400, detail="Invalid pagination token")
+
+async def paginate(collection, query: dict, projection: dict, limit: int = DEFAULT_PAGE_SIZE, after: Optional[str] = None) -> dict:
+    """
+    Fetch one page of documents, newest first, using keyset pagination on _id.
+    Returns {"items": [...], "next_after": token or None}; _id is returned as a string.
+    The projection must not exclude _id, it is the pagination key.
+    """
+    query = dict(query)
+    if after:
+        query["_id"] = {"$lt": decode_cursor(after)}
+
+    # One extra document tells us whether another page exists
+    cursor = collection.find(query, projection).sort("_id", -1).limit(limit + 1)
+    items = await cursor.to_list(length=limit + 1)
+
+    next_after = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_after = encode_cursor(items[-1]["_id"])
+
+    for item in items:
+        item["_id"] = str(item["_id"])
+
+    return {"items": items, "next_after": next_after}
@@ -0,0 +1,147 @@
+"""
+Local relevance ranking for long material text.
+
+The text is split into passages of about RETRIEVAL_PASSAGE_TOKENS, scored
+against a short query (subject, level) with Okapi BM25, and the best
+passages are kept up to a token budget, in their original order.
+
+Short queries often miss most of a document (a "Calculus" lecture rarely
+says "calculus"), so the query is expanded with the highest TF-IDF terms
+of the passages it matched best (pseudo-relevance feedback). When nothing
+matches at all, passages are ranked by how central they are to the
+document's own vocabulary instead.
+
+Everything is computed over flat (passage, term, count) arrays with numpy,
+never a passage x vocabulary matrix.
+"""
+import os
+import re
+import numpy as np
+from .text_chunker import estimate_tokens, split_text_into_chunks, truncate_to_tokens
+
+RETRIEVAL_PASSAGE_TOKENS = int(os.getenv("RETRIEVAL_PASSAGE_TOKENS", "200"))
+# Terms added to the query from the best matching passages, and their weight
+RETRIEVAL_EXPANSION_TERMS = int(os.getenv("RETRIEVAL_EXPANSION_TERMS", "12"))
+RETRIEVAL_EXPANSION_WEIGHT = float(os.getenv("RETRIEVAL_EXPANSION_WEIGHT", "0.4"))
+RETRIEVAL_FEEDBACK_PASSAGES = 5
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"[a-z][a-z0-9]+")
+
+STOPWORDS = frozenset("""
+about above after again against all also and any are because been before being below between both but can could
+did does doing down during each few for from further had has have having her here hers him his how into its itself
+just more most not now off once only other our ours out over own same she should some such than that the their
+theirs them then there these they this those through too under until very was were what when where which while who
+whom why will with would you your yours
+""".split())
+
+def tokenize(text: str) -> list:
+    """
+    Lowercase word tokens without stopwords or one-letter words.
+    """
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+class PassageIndex:
+    """
+    BM25 index over a list of passages.
+    """
+
+    def __init__(self, passages: list):
+        self.passages = passages
+        vocabulary = {}
+        passage_ids, term_ids = [], []
+        for index, passage in enumerate(passages):
+            for token in tokenize(passage):
+                passage_ids.append(index)
+                term_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+        self.vocabulary = vocabulary
+
+        passage_count = len(passages)
+        term_count = max(len(vocabulary), 1)
+        passage_ids = np.asarray(passage_ids, dtype=np.int64)
+        term_ids = np.asarray(term_ids, dtype=np.int64)
+
+        # One entry per distinct (passage, term) pair with its count
+        pairs, counts = np.unique(passage_ids * term_count + term_ids, return_counts=True)
+        self.pair_passages = pairs // term_count
+        self.pair_terms = pairs % term_count
+        self.pair_counts = counts.astype(np.float64)
+
+        lengths = np.bincount(passage_ids, minlength=passage_count).astype(np.float64)
+        average_length = lengths.mean() if passage_count and lengths.mean() > 0 else 1.0
+        document_frequency = np.bincount(self.pair_terms, minlength=term_count).astype(np.float64)
+        self.idf = np.log1p((passage_count - document_frequency + 0.5) / (document_frequency + 0.5))
+
+        # BM25 term-frequency saturation, per pair
+        normalizer = BM25_K1 * (1 - BM25_B + BM25_B * lengths / average_length)
+        self.pair_weights = self.pair_counts * (BM25_K1 + 1) / (self.pair_counts + normalizer[self.pair_passages])
+
+    def query_vector(self, query: str) -> np.ndarray:
+        vector = np.zeros(len(self.idf))
+        for token in tokenize(query):
+            term = self.vocabulary.get(token)
+            if term is not None:
+                vector[term] += 1.0
+        return vector
+
+    def score(self, query_vector: np.ndarray) -> np.ndarray:
+        """
+        BM25 score of every passage for a (weighted) query term vector.
+        """
+        contributions = query_vector[self.pair_terms] * self.idf[self.pair_terms] * self.pair_weights
+        return np.bincount(self.pair_passages, weights=contributions, minlength=len(self.passages))
+
+    def top_terms(self, passage_indices: np.ndarray, count: int) -> np.ndarray:
+        """
+        The count terms with the highest summed TF-IDF over the given passages.
+        """
+        mask = np.isin(self.pair_passages, passage_indices)
+        weights = np.bincount(
+            self.pair_terms[mask], weights=self.pair_counts[mask] * self.idf[self.pair_terms[mask]], minlength=len(self.idf)
+        )
+        top = np.argsort(-weights, kind="stable")[:count]
+        return top[weights[top] > 0]
+
+    def rank(self, query: str) -> np.ndarray:
+        """
+        Passage scores for the query, after pseudo-relevance feedback.
+        """
+        query_vector = self.query_vector(query)
+        scores = self.score(query_vector)
+        if not scores.any():
+            # Nothing matched: rank by centrality to the whole document
+            feedback = np.arange(len(self.passages))
+        else:
+            feedback = np.argsort(-scores, kind="stable")[:RETRIEVAL_FEEDBACK_PASSAGES]
+            feedback = feedback[scores[feedback] > 0]
+
+        expansion = self.top_terms(feedback, RETRIEVAL_EXPANSION_TERMS)
+        expanded = query_vector.copy()
+        expanded[expansion] += RETRIEVAL_EXPANSION_WEIGHT
+        return self.score(expanded)
+
+def select_passages(text: str, query: str, budget_tokens: int, passage_tokens: int = RETRIEVAL_PASSAGE_TOKENS) -> str:
+    """
+    The most relevant passages of text for the query, in document order,
+    up to budget_tokens (estimated). Text within the budget is returned as is.
+    """
+    if estimate_tokens(text) <= budget_tokens:
+        return text
+
+    passages = split_text_into_chunks(text, min(passage_tokens, max(budget_tokens, 1)))
+    if not passages:
+        return ""
+
+    scores = PassageIndex(passages).rank(query)
+    sizes = np.fromiter((estimate_tokens(passage) + 1 for passage in passages), dtype=np.int64, count=len(passages))
+
+    # Best first (earlier passages win ties) until the budget is spent
+    order = np.argsort(-scores, kind="stable")
+    chosen = order[np.cumsum(sizes[order]) <= budget_tokens]
+    if chosen.size == 0:
+        # Budget smaller than any passage: keep the start of the best one
+        return truncate_to_tokens(passages[order[0]], budget_tokens)
+    return "\n".join(passages[index] for index in np.sort(chosen).tolist())
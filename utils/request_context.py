@@ -0,0 +1,64 @@
+import re
+import time
+import uuid
+import logging
+from contextvars import ContextVar
+
+# Correlation id of the request being handled (None outside a request)
+request_id_var: ContextVar = ContextVar("request_id", default=None)
+
+# Incoming X-Request-ID values we are willing to echo back
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._:-]{1,128}$")
+
+access_logger = logging.getLogger("app.access")
+
+class RequestContextMiddleware:
+    """
+    Give every HTTP request a correlation id (the caller's X-Request-ID when
+    it looks sane, otherwise a new one), expose it to log records through
+    request_id_var, echo it in the response and log one access record.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                candidate = value.decode("latin-1")
+                if _REQUEST_ID_PATTERN.match(candidate):
+                    request_id = candidate
+                break
+        if request_id is None:
+            request_id = uuid.uuid4().hex
+
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            access_logger.info(
+                "request completed",
+                extra={
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status_code,
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+                }
+            )
+            request_id_var.reset(token)
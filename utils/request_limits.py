@@ -0,0 +1,52 @@
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse
+from config import MAX_UPLOAD_BYTES
+
+# Room for multipart boundaries and the other form fields around the file
+MULTIPART_OVERHEAD_BYTES = 1024 * 1024
+
+def _too_large_detail(max_upload_bytes: int) -> str:
+    return f"Request too large. Maximum upload size is {max_upload_bytes // (1024 * 1024)}MB."
+
+class RequestSizeLimitMiddleware:
+    """
+    Reject request bodies over the size limit with 413.
+    A declared Content-Length over the limit is refused before the body is
+    read; the bytes actually received are counted as well, so chunked
+    requests without a Content-Length are cut off too.
+    path_limits overrides the upload size for exact paths (e.g. the bulk imports).
+    """
+
+    def __init__(self, app, max_upload_bytes: int = MAX_UPLOAD_BYTES, path_limits: dict = None):
+        self.app = app
+        self.max_upload_bytes = max_upload_bytes
+        self.path_limits = path_limits or {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        max_upload_bytes = self.path_limits.get(scope["path"].rstrip("/"), self.max_upload_bytes)
+        limit = max_upload_bytes + MULTIPART_OVERHEAD_BYTES
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    response = JSONResponse(status_code=413, content={"detail": _too_large_detail(max_upload_bytes)})
+                    await response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Raised while the body is parsed; rendered by the exception middleware
+                    raise HTTPException(status_code=413, detail=_too_large_detail(max_upload_bytes))
+            return message
+
+        await self.app(scope, receive_limited, send)
@@ -0,0 +1,100 @@
+import re
+
+# Rough Gemini tokenizer ratio for English prose; good enough for budgeting
+CHARS_PER_TOKEN = 4
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in a piece of text.
+    """
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def _split_oversized(piece: str, max_chars: int) -> list:
+    """
+    Split a paragraph that is too long on its own, on sentence boundaries first
+    and hard character boundaries as a last resort.
+    """
+    parts = []
+    current = []
+    current_len = 0
+    for sentence in _SENTENCE_END.split(piece):
+        while len(sentence) > max_chars:
+            parts.append(sentence[:max_chars])
+            sentence = sentence[max_chars:]
+        if current and current_len + len(sentence) + 1 > max_chars:
+            parts.append(" ".join(current))
+            current, current_len = [], 0
+        current.append(sentence)
+        current_len += len(sentence) + 1
+    if current:
+        parts.append(" ".join(current))
+    return parts
+
+def split_text_into_chunks(text: str, max_tokens: int) -> list:
+    """
+    Split text into chunks of at most max_tokens (estimated), keeping
+    paragraphs and sentences together wherever possible.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return [text] if text.strip() else []
+
+    chunks = []
+    current = []
+    current_len = 0
+    for paragraph in text.split("\n"):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+
+        pieces = [paragraph] if len(paragraph) <= max_chars else _split_oversized(paragraph, max_chars)
+        for piece in pieces:
+            if current and current_len + len(piece) + 1 > max_chars:
+                chunks.append("\n".join(current))
+                current, current_len = [], 0
+            current.append(piece)
+            current_len += len(piece) + 1
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut text down to at most max_tokens (estimated), ending on a paragraph
+    or sentence boundary when one falls in the second half of the budget.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+
+    cut = text[:max_chars]
+    boundary = cut.rfind("\n")
+    if boundary < max_chars // 2:
+        sentence_ends = [match.start() for match in _SENTENCE_END.finditer(cut)]
+        boundary = sentence_ends[-1] if sentence_ends else -1
+    if boundary >= max_chars // 2:
+        cut = cut[:boundary]
+    return cut.rstrip()
+
+def allocate_token_budget(sizes: list, budget: int, min_share: int = 0) -> list:
+    """
+    Split a token budget between texts of the given token sizes. Everything
+    fits: every text keeps its size. Otherwise each text gets up to
+    min_share tokens first and the rest of the budget in proportion to
+    its size. Returns one share per text.
+    """
+    if sum(sizes) <= budget:
+        return list(sizes)
+
+    floors = [min(size, min_share) for size in sizes]
+    if sum(floors) >= budget:
+        # Not even the minimum fits: split the budget evenly instead
+        return [min(size, budget // len(sizes)) for size in sizes]
+
+    remaining = budget - sum(floors)
+    rest = [size - floor for size, floor in zip(sizes, floors)]
+    rest_total = sum(rest)
+    return [floor + (remaining * extra) // rest_total for floor, extra in zip(floors, rest)]